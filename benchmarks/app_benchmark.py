@@ -0,0 +1,293 @@
+"""Web endpoint and pipeline benchmarks on synthetic data
+
+Seeds a database with generated articles, prices, users, bookmarks and
+preferences. Then drives the main pages through the Flask test client and
+feeds generated items through DatabasePipeline. Latency percentiles and
+throughput are printed per benchmark and can be saved as a baseline for
+later runs to be compared against.
+
+Run with:  python benchmarks/app_benchmark.py [--news 20000] [--save base.json] [--baseline base.json]
+
+The database defaults to a fresh SQLite file. Pass --database-uri with a
+local MySQL database to benchmark the pipeline as well, since its SQL is
+MySQL only. The database is dropped and reseeded on every run.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = """
+earnings revenue guidance outlook shares rally slump investors analysts quarter growth margins demand
+supply chain inflation rates federal reserve bond yields dividend buyback forecast upgrade downgrade
+record profit loss market stocks index futures trading volatility sector technology energy banks
+consumer retail cloud chips semiconductors regulators merger acquisition deal lawsuit layoffs hiring
+""".split()
+
+SOURCES = ['Yahoo Finance', 'Reuters', 'CNBC']
+
+PERCENTILES = (50, 90, 99)
+
+
+def sentence(rng, length):
+    return ' '.join(rng.choice(WORDS) for _ in range(length)).capitalize() + '.'
+
+
+def insert_rows(db, model, rows, chunk_size=1000):
+    for offset in range(0, len(rows), chunk_size):
+        db.session.execute(model.__table__.insert(), rows[offset:offset + chunk_size])
+    db.session.commit()
+
+
+def seed_database(args, rng):
+    """Create the schema and fill it with synthetic rows; returns what the requests need"""
+    from app import app, db
+    from models import (FinancialNews, NewsSymbol, RelatedNews, StockPrice, StockTick, StockBarHourly,
+                        StockBarDaily, LatestQuote, User, UserPreference, Bookmark, DataVersion)
+    from tracked_symbols import COMPANY_NAMES
+    from werkzeug.security import generate_password_hash
+
+    symbols = list(COMPANY_NAMES)[:args.symbols]
+    now = datetime.now().replace(microsecond=0)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        news, tags, related = [], [], []
+        for news_id in range(1, args.news + 1):
+            mentioned = rng.sample(symbols, rng.randint(0, 2))
+            names = [COMPANY_NAMES[symbol][0] for symbol in mentioned]
+            news.append({
+                'id': news_id,
+                'title': ' '.join(names + [sentence(rng, 8)])[:255],
+                'link': f"https://example.com/news/{news_id}.html",
+                'summary': sentence(rng, 25),
+                'content': '\n\n'.join(sentence(rng, 40) for _ in range(8)),
+                'source': rng.choice(SOURCES),
+                'publish_date': (now - timedelta(minutes=news_id)).isoformat(),
+                'sentiment': round(rng.uniform(-1, 1), 3),
+                'scraped_date': now - timedelta(minutes=args.news - news_id),
+                'created_at': now,
+            })
+            tags += [{'news_id': news_id, 'symbol': symbol, 'mentions': 1} for symbol in mentioned]
+            for related_id in rng.sample(range(max(1, news_id - 50), news_id), min(3, news_id - 1)):
+                related.append({'news_id': news_id, 'related_id': related_id, 'score': round(rng.random(), 4)})
+                related.append({'news_id': related_id, 'related_id': news_id, 'score': round(rng.random(), 4)})
+        insert_rows(db, FinancialNews, news)
+        insert_rows(db, NewsSymbol, tags)
+        insert_rows(db, RelatedNews, list({(row['news_id'], row['related_id']): row for row in related}.values()))
+
+        prices, ticks, hourly, daily, latest = [], [], [], [], []
+        for symbol in symbols:
+            price = rng.uniform(50, 500)
+            for hour in range(args.days * 24, -1, -1):
+                ts = now - timedelta(hours=hour)
+                change = rng.uniform(-1.5, 1.5)
+                price = max(1.0, price + change)
+                row = {'symbol': symbol, 'price': round(price, 2), 'change_amount': round(change, 2),
+                       'change_percent': round(change / price * 100, 2), 'volume': rng.randint(10 ** 5, 10 ** 7),
+                       'market_cap': rng.randint(10 ** 9, 10 ** 12), 'source': 'Yahoo Finance'}
+                hourly.append({'symbol': symbol, 'bucket_start': ts.replace(minute=0, second=0), 'open': row['price'],
+                               'high': row['price'] + 1, 'low': row['price'] - 1, 'close': row['price'],
+                               'volume': row['volume'], 'tick_count': 20})
+                if hour < 24:
+                    ticks += [dict(row, ts=ts - timedelta(minutes=minute)) for minute in range(0, 60, 3)]
+                if hour % 24 == 0:
+                    # stock_prices keeps one row per symbol and trading day
+                    prices.append(dict(row, scraped_date=ts, trade_date=ts.date()))
+                    daily.append(dict(hourly[-1], bucket_start=ts.replace(hour=0, minute=0, second=0)))
+            latest.append(dict(row, scraped_date=now))
+        for model, rows in ((StockPrice, prices), (StockTick, ticks), (StockBarHourly, hourly),
+                            (StockBarDaily, daily), (LatestQuote, latest)):
+            insert_rows(db, model, rows)
+
+        # One password hash for everyone; hashing per user would dominate seeding
+        password_hash = generate_password_hash('benchmark')
+        users, preferences, bookmarks = [], [], []
+        for user_id in range(1, args.users + 1):
+            users.append({'id': user_id, 'username': f"user{user_id}", 'email': f"user{user_id}@example.com",
+                          'password_hash': password_hash, 'created_at': now})
+            preferences.append({'user_id': user_id, 'watch_symbols': ','.join(rng.sample(symbols, min(5, len(symbols)))),
+                                'preferred_sources': ','.join(SOURCES), 'theme': 'light',
+                                'created_at': now, 'updated_at': now})
+            bookmarks += [{'user_id': user_id, 'news_id': news_id, 'created_at': now}
+                          for news_id in rng.sample(range(1, args.news + 1), min(args.bookmarks, args.news))]
+        insert_rows(db, User, users)
+        insert_rows(db, UserPreference, preferences)
+        insert_rows(db, Bookmark, bookmarks)
+        insert_rows(db, DataVersion, [{'name': name, 'version': 1, 'updated_at': now}
+                                      for name in ('financial_news', 'stock_prices')])
+
+    return symbols
+
+
+def summarize(latencies, elapsed, errors=0):
+    import numpy as np
+    values = np.array(latencies) * 1000
+    result = {f"p{p}_ms": round(float(np.percentile(values, p)), 3) for p in PERCENTILES}
+    result.update({
+        'mean_ms': round(float(values.mean()), 3),
+        'throughput': round(len(latencies) / elapsed, 1),
+        'count': len(latencies),
+        'errors': errors,
+    })
+    return result
+
+
+def benchmark_endpoints(args, symbols, rng):
+    from app import app
+
+    client = app.test_client()
+    user_id = rng.randint(1, args.users)
+    client.post('/login', data={'email': f"user{user_id}@example.com", 'password': 'benchmark'})
+
+    endpoints = {
+        'home': lambda: '/',
+        'search': lambda: f"/search?q={rng.choice(WORDS)}",
+        'stock_detail': lambda: f"/stock/{rng.choice(symbols)}",
+        'news_detail': lambda: f"/news/{rng.randint(1, args.news)}",
+        'profile': lambda: '/profile',
+        'stock_history_api': lambda: f"/api/stock/{rng.choice(symbols)}/history?days={rng.choice([1, 7, 30, 365])}",
+    }
+
+    results = {}
+    for name, make_url in endpoints.items():
+        for _ in range(args.warmup):
+            client.get(make_url())
+
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            url = make_url()
+            start = time.perf_counter()
+            response = client.get(url)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+        results[name] = summarize(latencies, time.perf_counter() - started, errors)
+    return results
+
+
+def benchmark_pipeline(args, symbols, rng):
+    """Feed generated news and stock items through DatabasePipeline"""
+    from scrapy import Spider
+    from investor_info.items import FinancialNewsItem, StockPriceItem
+    from investor_info.pipelines import DatabasePipeline
+
+    spider = Spider(name='benchmark')
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    news_items = []
+    for number in range(args.pipeline_items):
+        # Every tenth article is a syndicated copy of the one before it
+        content = news_items[-1]['content'] if number % 10 == 9 else '\n\n'.join(sentence(rng, 40) for _ in range(8))
+        news_items.append(FinancialNewsItem(
+            title=sentence(rng, 10), link=f"https://example.com/pipeline/{number}.html", summary=sentence(rng, 25),
+            content=content, source=rng.choice(SOURCES), publish_date=now, scraped_date=now
+        ))
+    stock_items = [
+        StockPriceItem(symbol=rng.choice(symbols), price=round(rng.uniform(50, 500), 2), change_amount=0.5,
+                       change_percent=0.2, volume=1000, market_cap=10 ** 10, source='Yahoo Finance', scraped_date=now)
+        for _ in range(args.pipeline_items)
+    ]
+
+    results = {}
+    for name, items in (('pipeline_news', news_items), ('pipeline_stock', stock_items)):
+        pipeline = DatabasePipeline(batch_size=args.batch_size, flush_interval=0)
+        pipeline.open_spider(spider)
+        latencies = []
+        started = time.perf_counter()
+        for item in items:
+            start = time.perf_counter()
+            pipeline.process_item(item, spider)
+            latencies.append(time.perf_counter() - start)
+        pipeline.close_spider(spider)
+        results[name] = summarize(latencies, time.perf_counter() - started)
+    return results
+
+
+def print_results(results, baseline=None, tolerance=10.0):
+    """Print a results table; returns the benchmarks whose median regressed beyond tolerance percent"""
+    regressions = []
+    header = f"{'benchmark':<20} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'req/s':>9} {'errors':>7}"
+    print(header + (f" {'p50 vs base':>12} {'req/s vs base':>14}" if baseline else ''))
+    for name, result in results.items():
+        line = (f"{name:<20} {result['p50_ms']:>9.2f} {result['p90_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                f"{result['throughput']:>9.1f} {result['errors']:>7}")
+        base = (baseline or {}).get(name)
+        if base:
+            p50_change = (result['p50_ms'] - base['p50_ms']) / base['p50_ms'] * 100 if base['p50_ms'] else 0.0
+            throughput_change = (result['throughput'] - base['throughput']) / base['throughput'] * 100 if base['throughput'] else 0.0
+            line += f" {p50_change:>+11.1f}% {throughput_change:>+13.1f}%"
+            if p50_change > tolerance:
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Web endpoint and pipeline benchmarks')
+    parser.add_argument('--database-uri', help='database to seed (default: a fresh SQLite file)')
+    parser.add_argument('--news', type=int, default=5000, help='articles to seed')
+    parser.add_argument('--symbols', type=int, default=20, help='tracked symbols to seed, at most 20')
+    parser.add_argument('--days', type=int, default=30, help='days of price history per symbol')
+    parser.add_argument('--users', type=int, default=100, help='users to seed')
+    parser.add_argument('--bookmarks', type=int, default=20, help='bookmarks per user')
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=10, help='untimed requests per endpoint')
+    parser.add_argument('--pipeline-items', type=int, default=2000, help='items of each kind fed to the pipeline')
+    parser.add_argument('--batch-size', type=int, default=100, help='pipeline batch size')
+    parser.add_argument('--page-cache', action='store_true', help='keep the page cache on (off by default)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for the synthetic data')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare with results saved by an earlier run')
+    parser.add_argument('--tolerance', type=float, default=10.0, help='allowed p50 regression in percent')
+    args = parser.parse_args()
+
+    # Configuration is read from the environment when the app is imported
+    uri = args.database_uri or f"sqlite:///{os.path.join(tempfile.gettempdir(), 'investor_info_benchmark.db')}"
+    os.environ['DATABASE_URI'] = uri
+    os.environ.setdefault('CACHE_BACKEND', 'memory' if args.page_cache else 'none')
+    os.environ.setdefault('SERVER_TIMING', 'off')
+    sys.path.insert(0, os.path.join(ROOT, 'web_app'))
+    sys.path.insert(1, ROOT)
+    sys.path.insert(2, os.path.dirname(ROOT))
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    symbols = seed_database(args, rng)
+    print(f"Seeded {args.news} articles, {len(symbols)} symbols x {args.days} days, {args.users} users "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    results = benchmark_endpoints(args, symbols, rng)
+    if uri.startswith('mysql'):
+        results.update(benchmark_pipeline(args, symbols, rng))
+    else:
+        print("Skipping the pipeline benchmarks: DatabasePipeline needs MySQL")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    regressions = print_results(results, baseline, args.tolerance)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'database': uri.split(':', 1)[0],
+                'volumes': {key: getattr(args, key) for key in ('news', 'symbols', 'days', 'users', 'bookmarks')},
+                'results': results,
+            }, f, indent=2)
+        print(f"Results saved to {args.save}")
+
+    if regressions:
+        print(f"Median latency regressed by more than {args.tolerance:.0f}%: {', '.join(regressions)}")
+        sys.exit(1)
@@ -0,0 +1,64 @@
+"""Article parser benchmark on saved HTML fixtures
+
+Times extract_article on every fixture in benchmarks/fixtures, once with
+the embedded JSON fast path and once with the per-source selectors only,
+and checks that both paths extract the same title and content.
+
+Run with:  python benchmarks/parser_benchmark.py [--repeat 200]
+"""
+import os
+import sys
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+# Fixture name prefix -> (article URL, source)
+FIXTURE_SOURCES = {
+    'yahoo': ('https://finance.yahoo.com/news/apple-shares-rise-200000000.html', 'Yahoo Finance'),
+    'reuters': ('https://www.reuters.com/business/finance/apple-shares-rise-2024-05-02/', 'Reuters'),
+    'cnbc': ('https://www.cnbc.com/2024/05/02/apple-shares-rise.html', 'CNBC'),
+}
+
+
+def time_parser(body, url, source, use_embedded, repeat):
+    """Mean microseconds per parse; a fresh response each time so no parsed DOM is reused"""
+    from scrapy.http import HtmlResponse
+    from investor_info.article_parser import extract_article
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fields, method = extract_article(HtmlResponse(url, body=body, encoding='utf-8'), source, use_embedded)
+    elapsed = time.perf_counter() - start
+    return elapsed / repeat * 1e6, fields, method
+
+
+def run_benchmark(repeat):
+    print(f"{'fixture':<24} {'method':<10} {'fast path':>11} {'selectors':>11} {'speedup':>8}")
+    for name in sorted(os.listdir(FIXTURES)):
+        if not name.endswith('.html'):
+            continue
+        url, source = FIXTURE_SOURCES[name.split('_', 1)[0]]
+        with open(os.path.join(FIXTURES, name), 'rb') as f:
+            body = f.read()
+
+        fast, fields, method = time_parser(body, url, source, True, repeat)
+        slow, baseline, _ = time_parser(body, url, source, False, repeat)
+        if fields is None or baseline is None:
+            print(f"{name:<24} no article extracted")
+            continue
+        if (fields['title'], fields['content']) != (baseline['title'], baseline['content']):
+            print(f"{name:<24} WARNING: fast path and selectors disagree")
+        print(f"{name:<24} {method:<10} {fast:>9.0f}us {slow:>9.0f}us {slow / fast:>7.1f}x")
+
+
+if __name__ == '__main__':
+    # The spider imports the parser as investor_info.article_parser; time the same module
+    sys.path.insert(0, os.path.dirname(ROOT))
+
+    parser = argparse.ArgumentParser(description='Article parser benchmark')
+    parser.add_argument('--repeat', type=int, default=200, help='parses per fixture and method')
+    args = parser.parse_args()
+
+    run_benchmark(args.repeat)
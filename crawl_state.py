@@ -0,0 +1,103 @@
+"""Persistent state for incremental crawls
+
+Keeps the URLs a spider has already downloaded and the ETag/Last-Modified
+validators of listing pages between runs, so the next crawl can skip known
+articles before downloading them and revalidate listings with conditional
+requests. State is stored as JSON in CRAWL_STATE_DIR, one file per spider.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+from w3lib.url import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+
+
+def url_fingerprint(url):
+    """Short stable hash of a canonicalized URL"""
+    canonical = canonicalize_url(url, keep_fragments=False)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class CrawlState:
+    """Seen-URL set and HTTP validators for one spider, persisted to disk"""
+
+    def __init__(self, path, seen_ttl_days=90):
+        self.path = path
+        self.seen_ttl = seen_ttl_days * DAY
+        self.seen = {}
+        self.validators = {}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return self
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable crawl state {self.path}: {e}")
+            return self
+
+        # Forget URLs not seen for seen_ttl_days so the file does not grow forever
+        cutoff = time.time() - self.seen_ttl
+        self.seen = {key: seen_at for key, seen_at in data.get('seen', {}).items() if seen_at >= cutoff}
+        self.validators = data.get('validators', {})
+        return self
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file first so an interrupted save keeps the old state
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'seen': self.seen, 'validators': self.validators}, f)
+        os.replace(tmp_path, self.path)
+
+    def is_seen(self, url):
+        return url_fingerprint(url) in self.seen
+
+    def mark_seen(self, url):
+        self.seen[url_fingerprint(url)] = int(time.time())
+
+    def mark_all_seen(self, urls):
+        now = int(time.time())
+        count = 0
+        for url in urls:
+            self.seen.setdefault(url_fingerprint(url), now)
+            count += 1
+        return count
+
+    def request_headers(self, url):
+        """Conditional request headers for a URL fetched before, if it sent validators"""
+        cached = self.validators.get(url)
+        if not cached:
+            return {}
+        headers = {}
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        return headers
+
+    def record_validators(self, url, etag=None, last_modified=None):
+        if etag or last_modified:
+            self.validators[url] = {'etag': etag, 'last_modified': last_modified}
+        else:
+            self.validators.pop(url, None)
+
+
+def stored_links(engine, chunk_size=5000):
+    """Stream every article link already stored, including links kept only as duplicates"""
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).exec_driver_sql(
+            "SELECT link FROM financial_news UNION ALL SELECT link FROM news_duplicates"
+        )
+        for rows in result.partitions(chunk_size):
+            for (link,) in rows:
+                yield link
@@ -0,0 +1,114 @@
+"""Long-lived crawler runtime that runs spiders on a schedule in one process
+
+A single Twisted reactor and CrawlerRunner stay alive for the lifetime of
+the service, so repeated crawls skip interpreter startup, Scrapy imports and
+settings loading. The DNS cache and the pipeline's database engine are
+process-wide and are reused by every run.
+"""
+import os
+import time
+import logging
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.log import configure_logging
+from scrapy.utils.misc import create_instance, load_object
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.reactor import install_reactor
+from twisted.internet import task, threads
+
+logger = logging.getLogger(__name__)
+
+STOCK_CRAWL_INTERVAL = int(os.environ.get('STOCK_CRAWL_INTERVAL', 180))
+NEWS_CRAWL_INTERVAL = int(os.environ.get('NEWS_CRAWL_INTERVAL', 7200))
+
+
+class CrawlerService:
+    """Schedules spiders and background jobs on one persistent reactor"""
+
+    def __init__(self, settings=None):
+        self.settings = settings or get_project_settings()
+        if self.settings.get('TWISTED_REACTOR'):
+            install_reactor(self.settings['TWISTED_REACTOR'], self.settings.get('ASYNCIO_EVENT_LOOP'))
+
+        from twisted.internet import reactor
+        self.reactor = reactor
+
+        configure_logging(self.settings)
+        self.runner = CrawlerRunner(self.settings)
+        self.running = {}
+        self.last_runs = {}
+        self.loops = []
+        self._install_resolver()
+
+    def _install_resolver(self):
+        # CrawlerRunner leaves DNS to the reactor; use Scrapy's caching resolver like CrawlerProcess does
+        resolver_class = load_object(self.settings['DNS_RESOLVER'])
+        resolver = create_instance(resolver_class, self.settings, self, reactor=self.reactor)
+        resolver.install_on_reactor()
+
+    def crawl(self, spider_name):
+        """Start a crawl unless one of the same spider is still running"""
+        if spider_name in self.running:
+            logger.warning(f"Skipping {spider_name}: previous run still in progress")
+            return None
+
+        crawler = self.runner.create_crawler(spider_name)
+        started = time.monotonic()
+        logger.info(f"Starting {spider_name} crawl")
+
+        deferred = self.runner.crawl(crawler)
+        self.running[spider_name] = deferred
+        deferred.addBoth(self._crawl_finished, spider_name, crawler, started)
+        return deferred
+
+    def _crawl_finished(self, result, spider_name, crawler, started):
+        self.running.pop(spider_name, None)
+        stats = crawler.stats.get_stats() if crawler.stats else {}
+        run = {
+            'duration': round(time.monotonic() - started, 2),
+            'items': stats.get('item_scraped_count', 0),
+            'requests': stats.get('downloader/request_count', 0),
+            'errors': stats.get('log_count/ERROR', 0),
+            'finish_reason': stats.get('finish_reason'),
+            'finished_at': time.time(),
+        }
+        self.last_runs[spider_name] = run
+
+        if hasattr(result, 'getTraceback'):
+            logger.error(f"{spider_name} crawl failed after {run['duration']}s: {result.getTraceback()}")
+        else:
+            logger.info(
+                f"{spider_name} crawl finished in {run['duration']}s: {run['items']} items, "
+                f"{run['requests']} requests, {run['errors']} errors ({run['finish_reason']})"
+            )
+        # Swallow failures so the schedule keeps running
+        return None
+
+    def schedule_spider(self, spider_name, interval, now=True):
+        """Run a spider every `interval` seconds; a slow run delays the next one instead of overlapping it"""
+        self._start_loop(lambda: self.crawl(spider_name), interval, now)
+
+    def schedule_job(self, job, interval, now=False):
+        """Run a blocking function every `interval` seconds in the reactor's thread pool"""
+        def run_job():
+            deferred = threads.deferToThread(job)
+            deferred.addErrback(lambda failure: logger.error(f"Job {job.__name__} failed: {failure.getErrorMessage()}"))
+            return deferred
+
+        self._start_loop(run_job, interval, now)
+
+    def _start_loop(self, function, interval, now):
+        loop = task.LoopingCall(function)
+        self.loops.append(loop)
+        self.reactor.callWhenRunning(loop.start, interval, now)
+
+    def stop(self):
+        """Stop scheduling new work and close running crawls"""
+        for loop in self.loops:
+            if loop.running:
+                loop.stop()
+        return self.runner.stop()
+
+    def run(self):
+        """Run the reactor until interrupted"""
+        self.reactor.addSystemEventTrigger('before', 'shutdown', self.stop)
+        self.reactor.run()
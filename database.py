@@ -0,0 +1,179 @@
+"""Shared database connection layer for the web app and the Scrapy pipeline"""
+import os
+import time
+import threading
+import logging
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+def env_bool(name, default):
+    """Read a boolean flag from the environment"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class PoolMetrics:
+    """Thread-safe counters for connection pool activity"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self.lock:
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def increment(self, counter):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool=None):
+        """Return the current metrics as a dictionary"""
+        with self.lock:
+            data = {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'total_wait_ms': round(self.total_wait * 1000, 3),
+                'avg_wait_ms': round(self.total_wait * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                'pool_size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': pool.overflow(),
+            })
+        return data
+
+
+# Process-wide metrics shared by every engine created through this module
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return conn
+
+
+class DatabaseConfig:
+    """Database URI and connection pool settings"""
+
+    def __init__(self, uri, pool_size=5, max_overflow=10, pool_pre_ping=True,
+                 pool_recycle=1800, pool_timeout=30):
+        self.uri = uri
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_pre_ping = pool_pre_ping
+        self.pool_recycle = pool_recycle
+        self.pool_timeout = pool_timeout
+
+    @classmethod
+    def from_env(cls):
+        """Build the configuration from environment variables"""
+        uri = os.environ.get('DATABASE_URI')
+        if not uri:
+            uri = 'mysql+pymysql://{user}:{password}@{host}:{port}/{name}'.format(
+                user=os.environ.get('DB_USER', 'root'),
+                password=os.environ.get('DB_PASSWORD', '12345'),
+                host=os.environ.get('DB_HOST', 'localhost'),
+                port=os.environ.get('DB_PORT', '3306'),
+                name=os.environ.get('DB_NAME', 'investor_info')
+            )
+
+        return cls(
+            uri,
+            pool_size=int(os.environ.get('DB_POOL_SIZE', 5)),
+            max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+            pool_pre_ping=env_bool('DB_POOL_PRE_PING', True),
+            pool_recycle=int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+            pool_timeout=int(os.environ.get('DB_POOL_TIMEOUT', 30))
+        )
+
+    @property
+    def is_sqlite(self):
+        return self.uri.startswith('sqlite')
+
+    def engine_options(self):
+        """Keyword arguments for create_engine / SQLALCHEMY_ENGINE_OPTIONS"""
+        options = {'pool_pre_ping': self.pool_pre_ping}
+
+        # SQLite uses its own pool implementations without size limits
+        if not self.is_sqlite:
+            options.update({
+                'poolclass': InstrumentedQueuePool,
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'pool_recycle': self.pool_recycle,
+                'pool_timeout': self.pool_timeout,
+            })
+        return options
+
+
+def instrument_engine(engine):
+    """Attach pool event listeners that feed pool_metrics"""
+    if getattr(engine, '_pool_metrics_attached', False):
+        return engine
+
+    event.listen(engine, 'connect', lambda *args: pool_metrics.increment('connects'))
+    event.listen(engine, 'checkout', lambda *args: pool_metrics.increment('checkouts'))
+    event.listen(engine, 'checkin', lambda *args: pool_metrics.increment('checkins'))
+    event.listen(engine, 'invalidate', lambda *args: pool_metrics.increment('invalidations'))
+    engine._pool_metrics_attached = True
+    return engine
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(config=None):
+    """Return the process-wide pooled engine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                config = config or DatabaseConfig.from_env()
+                _engine = instrument_engine(create_engine(config.uri, **config.engine_options()))
+                logger.info(f"Created database engine with pool size {config.pool_size}")
+    return _engine
+
+
+def dispose_engine():
+    """Close all pooled connections of the process-wide engine"""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
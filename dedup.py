@@ -0,0 +1,177 @@
+"""Near-duplicate detection for syndicated news articles
+
+Articles are reduced to MinHash signatures over word shingles. Signatures
+are split into bands and indexed with locality-sensitive hashing, so a new
+article is only compared with the few stored articles that share a band
+instead of the whole table. Candidates are confirmed by the Jaccard
+similarity estimated from the full signatures.
+
+Fingerprint existing articles with:  python dedup.py backfill
+"""
+import os
+import re
+import sys
+import zlib
+import argparse
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r'\w+')
+
+# Mersenne prime 2^61 - 1 used by the universal hash permutations
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+NUM_PERM = 128
+BANDS = 32
+SHINGLE_SIZE = 5
+MIN_WORDS = 30
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Return the set of hashed word shingles of a text"""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return set()
+    return {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+
+class NearDuplicateIndex:
+    """MinHash LSH index mapping article links to signatures
+
+    With 32 bands of 4 rows, articles with a Jaccard similarity of 0.8 are
+    found as candidates with a probability above 99.9%.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=NUM_PERM, bands=BANDS, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        # Random (a, b) pairs below the prime; like datasketch, a * hash + b is
+        # allowed to wrap around in uint64 arithmetic before the modulo
+        generator = np.random.RandomState(seed)
+        self.a = generator.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self.b = generator.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+
+        self.signatures = {}
+        self.buckets = [defaultdict(set) for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def signature(self, text, min_words=MIN_WORDS):
+        """MinHash signature of a text, or None if it is too short to compare"""
+        if not text or len(WORD_RE.findall(text)) < min_words:
+            return None
+        hashes = np.fromiter(shingles(text), dtype=np.uint64)
+        if not len(hashes):
+            return None
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % MERSENNE_PRIME
+        return (permuted.min(axis=1) & MAX_HASH).astype(np.uint32)
+
+    def from_bytes(self, data):
+        return np.frombuffer(data, dtype=np.uint32)
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key, signature):
+        if key in self.signatures:
+            self.remove(key)
+        self.signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self.buckets[band][band_key].add(key)
+
+    def remove(self, key):
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, band_key in self._band_keys(signature):
+            bucket = self.buckets[band].get(band_key)
+            if bucket:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band][band_key]
+
+    def query(self, signature, exclude=None):
+        """Return (key, similarity) of the most similar indexed article above the threshold"""
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self.buckets[band].get(band_key, ()))
+        candidates.discard(exclude)
+        if not candidates:
+            return None
+
+        keys = list(candidates)
+        matrix = np.stack([self.signatures[key] for key in keys])
+        similarities = (matrix == signature).mean(axis=1)
+        best = int(similarities.argmax())
+        if similarities[best] < self.threshold:
+            return None
+        return keys[best], float(similarities[best])
+
+
+def load_index(engine, window_days=30, threshold=0.8):
+    """Build an index from the fingerprints stored in the last window_days days"""
+    index = NearDuplicateIndex(threshold=threshold)
+    since = datetime.now() - timedelta(days=window_days)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).exec_driver_sql(
+            "SELECT link, minhash FROM news_fingerprints WHERE created_at >= %s", (since,)
+        )
+        for rows in result.partitions(5000):
+            for link, minhash in rows:
+                index.add(link, index.from_bytes(minhash))
+    return index
+
+
+def backfill_fingerprints(engine, batch_size=500):
+    """Store fingerprints for articles that do not have one yet"""
+    index = NearDuplicateIndex()
+    scanned = written = 0
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).exec_driver_sql(
+            "SELECT n.link, n.content, n.summary, n.scraped_date FROM financial_news n "
+            "LEFT JOIN news_fingerprints f ON f.link = n.link WHERE f.link IS NULL"
+        )
+        for rows in result.partitions(batch_size):
+            scanned += len(rows)
+            fingerprints = []
+            for link, content, summary, scraped_date in rows:
+                signature = index.signature(content or summary or '')
+                if signature is not None:
+                    fingerprints.append((link, signature.tobytes(), scraped_date or datetime.now()))
+            if not fingerprints:
+                continue
+
+            sql = (
+                "INSERT IGNORE INTO news_fingerprints (link, minhash, created_at) "
+                f"VALUES {', '.join(['(%s, %s, %s)'] * len(fingerprints))}"
+            )
+            with engine.begin() as write_conn:
+                write_conn.exec_driver_sql(sql, tuple(value for row in fingerprints for value in row))
+            written += len(fingerprints)
+
+    logger.info(f"Stored fingerprints for {written} of {scanned} articles")
+    return written
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description='Near-duplicate article detection')
+    parser.add_argument('command', choices=['backfill'])
+    args = parser.parse_args()
+
+    from database import get_engine
+    backfill_fingerprints(get_engine())
@@ -0,0 +1,124 @@
+"""Ticker and company mentions in news articles
+
+The pipeline tags every stored article with the tracked symbols it
+mentions, and the tags are kept in news_symbols so stock pages can find
+their news with an indexed lookup instead of scanning article text. The
+tracked symbols and their company names come from tracked_symbols.py.
+
+Tag existing articles with:  python entities.py backfill
+"""
+import os
+import re
+import sys
+import argparse
+import logging
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Tickers this short are ordinary words or abbreviations ("V", "MA", "HD"),
+# so they only count in explicit forms like $MA or (NYSE: MA)
+MIN_BARE_TICKER_LENGTH = 3
+
+EXCHANGES = r'(?:NYSE|NASDAQ|Nasdaq|NYSEARCA|AMEX)'
+
+
+class SymbolTagger:
+    """Finds tracked symbols in text with one compiled case-sensitive pattern"""
+
+    def __init__(self, companies):
+        self.lookup = {}
+        alternatives = []
+        for symbol, names in companies.items():
+            ticker = symbol.lstrip('^')
+            if not symbol.startswith('^'):
+                # $AAPL and (NASDAQ: AAPL) always count; a bare AAPL only for longer tickers
+                alternatives.append(rf'\${re.escape(ticker)}\b')
+                alternatives.append(rf'{EXCHANGES}:\s*{re.escape(ticker)}\b')
+                self.lookup[f'${ticker}'] = symbol
+                self.lookup[ticker] = symbol
+                if len(ticker) >= MIN_BARE_TICKER_LENGTH:
+                    alternatives.append(rf'(?<![\w$]){re.escape(ticker)}\b')
+            for name in names:
+                alternatives.append(rf'(?<!\w){re.escape(name)}(?!\w)')
+                self.lookup[name] = symbol
+
+        # Longest alternatives first so "Meta Platforms" wins over shorter overlaps
+        alternatives.sort(key=len, reverse=True)
+        self.pattern = re.compile('|'.join(alternatives))
+
+    def _symbol_for(self, matched):
+        if matched in self.lookup:
+            return self.lookup[matched]
+        # "NASDAQ: AAPL" style matches end with the ticker
+        return self.lookup.get(matched.rsplit(':', 1)[-1].strip())
+
+    def tag(self, *texts):
+        """Return {symbol: mention count} for the given texts"""
+        counts = Counter()
+        for text in texts:
+            if not text:
+                continue
+            for match in self.pattern.finditer(text):
+                symbol = self._symbol_for(match.group(0))
+                if symbol:
+                    counts[symbol] += 1
+        return dict(counts)
+
+
+def tag_rows_sql(row_count):
+    """INSERT ... SELECT resolving article ids from links for (link, symbol, mentions) rows"""
+    derived = ' UNION ALL '.join(['SELECT %s AS link, %s AS symbol, %s AS mentions'] * row_count)
+    return (
+        "INSERT INTO news_symbols (news_id, symbol, mentions) "
+        f"SELECT n.id, t.symbol, t.mentions FROM ({derived}) t "
+        "JOIN financial_news n ON n.link = t.link "
+        "ON DUPLICATE KEY UPDATE mentions = VALUES(mentions)"
+    )
+
+
+def backfill_symbols(engine, companies, batch_size=500):
+    """Tag every stored article with the given {symbol: names}, replacing existing tags"""
+    tagger = SymbolTagger(companies)
+    scanned = tagged = 0
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).exec_driver_sql(
+            "SELECT id, title, summary, content FROM financial_news"
+        )
+        for rows in result.partitions(batch_size):
+            scanned += len(rows)
+            tags = [
+                (news_id, symbol, mentions)
+                for news_id, title, summary, content in rows
+                for symbol, mentions in tagger.tag(title, summary, content).items()
+            ]
+
+            ids = [row[0] for row in rows]
+            with engine.begin() as write_conn:
+                write_conn.exec_driver_sql(
+                    f"DELETE FROM news_symbols WHERE news_id IN ({', '.join(['%s'] * len(ids))})", tuple(ids)
+                )
+                if tags:
+                    write_conn.exec_driver_sql(
+                        "INSERT INTO news_symbols (news_id, symbol, mentions) "
+                        f"VALUES {', '.join(['(%s, %s, %s)'] * len(tags))}",
+                        tuple(value for tag in tags for value in tag)
+                    )
+            tagged += len(tags)
+
+    logger.info(f"Stored {tagged} symbol tags for {scanned} articles")
+    return tagged
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description='Symbol mentions in news articles')
+    parser.add_argument('command', choices=['backfill'])
+    args = parser.parse_args()
+
+    from database import get_engine
+    from tracked_symbols import load_tracked_companies
+    engine = get_engine()
+    backfill_symbols(engine, load_tracked_companies(engine))
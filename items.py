@@ -10,6 +10,7 @@ class FinancialNewsItem(scrapy.Item):
     publish_date = scrapy.Field()
     sentiment = scrapy.Field()  # Optional sentiment score
     scraped_date = scrapy.Field()
+    redirect_urls = scrapy.Field()  # URLs that redirected to link, remembered as crawled with it
 
 class StockPriceItem(scrapy.Item):
     """Item for storing stock price information"""
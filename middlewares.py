@@ -4,6 +4,7 @@
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
@@ -101,3 +102,44 @@ class InvestorInfoDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+class ConditionalRequestMiddleware:
+    """Revalidates listing pages with ETag/Last-Modified between crawls
+
+    Applies to requests flagged with meta['conditional'] on spiders that
+    keep a crawl_state. A 304 means the page is unchanged since the last
+    crawl, so its links are not extracted again.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        s = cls()
+        s.stats = crawler.stats
+        return s
+
+    def process_request(self, request, spider):
+        state = getattr(spider, 'crawl_state', None)
+        if state is None or not request.meta.get('conditional'):
+            return None
+
+        for name, value in state.request_headers(request.url).items():
+            request.headers.setdefault(name, value)
+        return None
+
+    def process_response(self, request, response, spider):
+        state = getattr(spider, 'crawl_state', None)
+        if state is None or not request.meta.get('conditional'):
+            return response
+
+        if response.status == 304:
+            self.stats.inc_value('crawl_state/not_modified', spider=spider)
+            raise IgnoreRequest(f"Not modified since last crawl: {request.url}")
+
+        if response.status == 200:
+            state.record_validators(
+                request.url,
+                etag=response.headers.get('ETag', b'').decode('latin-1') or None,
+                last_modified=response.headers.get('Last-Modified', b'').decode('latin-1') or None
+            )
+        return response
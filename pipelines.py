@@ -1,159 +1,544 @@
-import mysql.connector
-from mysql.connector import Error
 import logging
+import time
+from datetime import datetime
+from sqlalchemy.exc import SQLAlchemyError
+from twisted.internet import defer, reactor, task, threads
+from twisted.python.threadpool import ThreadPool
 from investor_info.items import FinancialNewsItem, StockPriceItem
+from investor_info.database import get_engine, pool_metrics
+from investor_info.dedup import load_index
+from investor_info.related import RelatedIndex
+from investor_info.entities import SymbolTagger, tag_rows_sql
+from investor_info.tracked_symbols import COMPANY_NAMES, load_tracked_companies
+from investor_info.sentiment import SentimentScorer
+
+NEWS_COLUMNS = ('title', 'link', 'summary', 'content', 'source', 'publish_date', 'sentiment', 'scraped_date')
+STOCK_COLUMNS = ('symbol', 'price', 'change_amount', 'change_percent', 'volume', 'market_cap', 'source', 'scraped_date', 'trade_date')
+
+LATEST_QUOTE_COLUMNS = ('symbol', 'price', 'change_amount', 'change_percent', 'volume', 'market_cap', 'source', 'scraped_date')
+TICK_COLUMNS = ('symbol', 'price', 'change_amount', 'change_percent', 'volume', 'market_cap', 'source', 'ts')
+
+FINGERPRINT_COLUMNS = ('link', 'minhash', 'created_at')
+DUPLICATE_COLUMNS = ('link', 'canonical_link', 'title', 'source', 'similarity', 'scraped_date')
+
+TOUCH_VERSION_SQL = """
+INSERT INTO data_versions (name, version, updated_at) VALUES (%s, 1, NOW())
+ON DUPLICATE KEY UPDATE version = version + 1, updated_at = NOW()
+"""
 
 class DatabasePipeline:
-    def __init__(self):
-        self.conn = None
-        self.cur = None
+    def __init__(self, buffered=True, batch_size=100, flush_interval=30,
+                 dedup=True, dedup_threshold=0.8, dedup_window_days=30, related=True, sentiment=True,
+                 async_writes=False, write_threads=2, max_pending_writes=4):
+        self.engine = None
         self.logger = logging.getLogger(__name__)
-    
+
+        # Buffered write settings
+        self.buffered = buffered
+        self.batch_size = max(1, batch_size) if buffered else 1
+        self.flush_interval = flush_interval
+        self.news_buffer = []
+        self.stock_buffer = []
+        self.last_flush = time.monotonic()
+        self.flush_task = None
+
+        # Near-duplicate detection of syndicated articles, index loaded on the first news item
+        self.dedup = dedup
+        self.dedup_threshold = dedup_threshold
+        self.dedup_window_days = dedup_window_days
+        self.news_index = None
+        self.fingerprint_buffer = []
+        self.duplicate_buffer = []
+
+        # Precompute related articles for every stored batch; the scoring pool is kept between batches
+        self.related = related
+        self.related_index = RelatedIndex()
+
+        # Tracked symbols mentioned by each article, stored in news_symbols; watchlist symbols are added on open
+        self.symbol_tagger = SymbolTagger(COMPANY_NAMES)
+        self.symbol_buffer = []
+
+        # URLs that redirected to each buffered article, passed to the spider once the batch is stored
+        self.redirect_buffer = {}
+
+        # Articles without a sentiment from the spider are scored in batches on flush
+        self.sentiment_scorer = SentimentScorer() if sentiment else None
+
+        # Writes off the reactor thread on a bounded pool; news and stock batches each keep their order
+        self.async_writes = async_writes
+        self.write_threads = max(1, write_threads)
+        self.max_pending_writes = max(1, max_pending_writes)
+        self.thread_pool = None
+        self.shutdown_trigger = None
+        self.write_locks = {'news': defer.DeferredLock(), 'stocks': defer.DeferredLock()}
+        self.pending_writes = 0
+        self.capacity_waiters = []
+        self.drain_waiters = []
+        self.last_write = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            buffered=settings.getbool('DB_BUFFERED_WRITES', True),
+            batch_size=settings.getint('DB_BATCH_SIZE', 100),
+            flush_interval=settings.getfloat('DB_FLUSH_INTERVAL', 30),
+            dedup=settings.getbool('DEDUP_ENABLED', True),
+            dedup_threshold=settings.getfloat('DEDUP_THRESHOLD', 0.8),
+            dedup_window_days=settings.getint('DEDUP_WINDOW_DAYS', 30),
+            related=settings.getbool('RELATED_ENABLED', True),
+            sentiment=settings.getbool('SENTIMENT_ENABLED', True),
+            async_writes=settings.getbool('DB_ASYNC_WRITES', False),
+            write_threads=settings.getint('DB_WRITE_THREADS', 2),
+            max_pending_writes=settings.getint('DB_MAX_PENDING_WRITES', 4)
+        )
+
     def open_spider(self, spider):
         try:
-            # Update these with your MySQL credentials - consider using environment variables
-            self.conn = mysql.connector.connect(
-                host='localhost',
-                port=3306,
-                user='root',  # Change this or use environment variables
-                password='12345',  # Change this or use environment variables
-                database='investor_info'
-            )
-            if self.conn.is_connected():
-                self.cur = self.conn.cursor()
-                spider.logger.info("Connected to MySQL database")
-        except Error as e:
+            # Connections come from the shared pool configured through DB_* environment variables
+            engine = get_engine()
+            with engine.connect():
+                pass
+            self.engine = engine
+            spider.logger.info("Connected to MySQL database")
+        except SQLAlchemyError as e:
             spider.logger.error(f"Error connecting to MySQL: {e}")
-    
+
+        # Flush partially filled buffers on a timer so slow crawls still get written
+        if self.buffered and self.flush_interval > 0:
+            self.flush_task = task.LoopingCall(self._flush_if_due, spider)
+            self.flush_task.start(self.flush_interval, now=False)
+
+        if self.async_writes and self.engine is not None:
+            self.thread_pool = ThreadPool(minthreads=1, maxthreads=self.write_threads, name='db-writes')
+            self.thread_pool.start()
+            self.shutdown_trigger = reactor.addSystemEventTrigger('during', 'shutdown', self.thread_pool.stop)
+
+            # Load the tracked symbols and the dedup index off the reactor too; the crawl starts once they are ready
+            return threads.deferToThreadPool(reactor, self.thread_pool, self._load_spider_state, spider)
+
+        if self.engine is not None:
+            self._load_symbol_tagger(spider)
+
+    def _load_spider_state(self, spider):
+        self._load_symbol_tagger(spider)
+        if self.dedup:
+            self._load_news_index(spider)
+
+    def _load_symbol_tagger(self, spider):
+        """Tag watchlist symbols too, not only the built-in ones"""
+        try:
+            self.symbol_tagger = SymbolTagger(load_tracked_companies(self.engine))
+        except SQLAlchemyError as e:
+            spider.logger.error(f"Could not load watchlist symbols, tagging built-in symbols only: {e}")
+
     def close_spider(self, spider):
-        if self.conn and self.conn.is_connected():
-            self.cur.close()
-            self.conn.close()
-            spider.logger.info("MySQL connection closed")
-    
+        if self.flush_task and self.flush_task.running:
+            self.flush_task.stop()
+
+        # Write anything still waiting in the buffers
+        self.flush(spider)
+
+        if self.thread_pool is None:
+            self._release_engine(spider)
+            return None
+
+        # Let queued writes finish before the pool and the engine go away
+        drained = defer.Deferred()
+        self.drain_waiters.append(drained)
+        self._notify_writers()
+        return drained.addCallback(lambda _: self._stop_thread_pool(spider))
+
+    def _stop_thread_pool(self, spider):
+        reactor.removeSystemEventTrigger(self.shutdown_trigger)
+        self.thread_pool.stop()
+        self.thread_pool = None
+        self._release_engine(spider)
+
+    def _release_engine(self, spider):
+        if self.engine is not None:
+            self.engine = None
+            spider.logger.info(f"Database pool metrics: {pool_metrics.snapshot()}")
+
     def process_item(self, item, spider):
-        if not self.conn or not self.conn.is_connected():
+        if self.engine is None:
             spider.logger.error("No database connection available")
             return item
-            
+
         try:
             if isinstance(item, FinancialNewsItem):
-                return self._process_news_item(item, spider)
+                self._process_news_item(item, spider)
             elif isinstance(item, StockPriceItem):
-                return self._process_stock_item(item, spider)
+                self._process_stock_item(item, spider)
             else:
                 spider.logger.warning(f"Unknown item type: {type(item)}")
                 return item
-        except Error as e:
+        except SQLAlchemyError as e:
             spider.logger.error(f"Error processing item: {e}")
             return item
-            
+
+        if self.thread_pool is None:
+            return item
+
+        # Unbuffered items wait for their own write; buffered ones only while the write queue is full
+        write, self.last_write = self.last_write, None
+        if write is not None and not self.buffered:
+            return write.addCallback(lambda _: item)
+        if self.pending_writes < self.max_pending_writes:
+            return item
+
+        spider.crawler.stats.inc_value('pipeline/backpressure_waits', spider=spider)
+        waiter = defer.Deferred()
+        self.capacity_waiters.append(waiter)
+        return waiter.addCallback(lambda _: item)
+
     def _process_news_item(self, item, spider):
-        try:
-            # Check if article already exists
-            check_sql = "SELECT id FROM financial_news WHERE link = %s"
-            self.cur.execute(check_sql, (item.get('link', ''),))
-            result = self.cur.fetchone()
-            
-            if result:
-                # Update existing article
-                update_sql = """
-                UPDATE financial_news 
-                SET title = %s, summary = %s, content = %s, source = %s, 
-                    publish_date = %s, sentiment = %s, scraped_date = %s
-                WHERE link = %s
-                """
-                self.cur.execute(update_sql, (
-                    item.get('title', ''),
-                    item.get('summary', ''),
-                    item.get('content', ''),
-                    item.get('source', ''),
-                    item.get('publish_date', ''),
-                    item.get('sentiment', 0.0),
-                    item.get('scraped_date', ''),
-                    item.get('link', '')
-                ))
-                spider.logger.info(f"Updated article: {item.get('title', '')}")
-            else:
-                # Insert new article
-                insert_sql = """
-                INSERT INTO financial_news 
-                (title, link, summary, content, source, publish_date, sentiment, scraped_date) 
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                self.cur.execute(insert_sql, (
-                    item.get('title', ''),
-                    item.get('link', ''),
-                    item.get('summary', ''),
-                    item.get('content', ''),
-                    item.get('source', ''),
-                    item.get('publish_date', ''),
-                    item.get('sentiment', 0.0),
-                    item.get('scraped_date', '')
+        link = item.get('link', '')
+        scraped_date = item.get('scraped_date') or datetime.now()
+        if item.get('redirect_urls'):
+            self.redirect_buffer[link] = item['redirect_urls']
+
+        # Syndicated copies of an article already stored are linked to it instead of stored again
+        signature = self._news_signature(item, spider)
+        if signature is not None:
+            match = self.news_index.query(signature, exclude=link)
+            if match:
+                canonical_link, similarity = match
+                spider.logger.info(f"Duplicate of {canonical_link} ({similarity:.2f}): {link}")
+                self.duplicate_buffer.append((
+                    link, canonical_link, item.get('title', ''), item.get('source', ''),
+                    round(similarity, 3), scraped_date
                 ))
-                spider.logger.info(f"Saved new article: {item.get('title', '')}")
-                
-            self.conn.commit()
-            
-        except Error as e:
-            spider.logger.error(f"Error saving to database: {e}")
-            
+                if len(self.duplicate_buffer) >= self.batch_size:
+                    self._flush_news(spider)
+                return item
+
+            self.news_index.add(link, signature)
+            self.fingerprint_buffer.append((link, signature.tobytes(), scraped_date))
+
+        mentions = self.symbol_tagger.tag(item.get('title'), item.get('summary'), item.get('content'))
+        self.symbol_buffer.extend((link, symbol, count) for symbol, count in mentions.items())
+
+        self.news_buffer.append((
+            item.get('title', ''),
+            link,
+            item.get('summary', ''),
+            item.get('content', ''),
+            item.get('source', ''),
+            item.get('publish_date', ''),
+            item.get('sentiment'),
+            scraped_date
+        ))
+
+        if len(self.news_buffer) >= self.batch_size:
+            self._flush_news(spider)
+
         return item
-        
+
+    def _news_signature(self, item, spider):
+        """MinHash signature of an article's text, or None when dedup is off or the text is too short"""
+        if not self.dedup:
+            return None
+
+        if self.news_index is None:
+            self._load_news_index(spider)
+            if not self.dedup:
+                return None
+
+        return self.news_index.signature(item.get('content') or item.get('summary') or '')
+
+    def _load_news_index(self, spider):
+        try:
+            self.news_index = load_index(self.engine, self.dedup_window_days, self.dedup_threshold)
+            spider.logger.info(f"Loaded {len(self.news_index)} article fingerprints for deduplication")
+        except SQLAlchemyError as e:
+            spider.logger.error(f"Could not load article fingerprints, deduplication disabled: {e}")
+            self.dedup = False
+
     def _process_stock_item(self, item, spider):
+        self.stock_buffer.append((
+            item.get('symbol', ''),
+            item.get('price', 0.0),
+            item.get('change_amount', 0.0),
+            item.get('change_percent', 0.0),
+            item.get('volume', 0),
+            item.get('market_cap', 0),
+            item.get('source', ''),
+            item.get('scraped_date', ''),
+            self._trade_date(item)
+        ))
+
+        if len(self.stock_buffer) >= self.batch_size:
+            self._flush_stocks(spider)
+
+        return item
+
+    def _trade_date(self, item):
+        """Return the calendar date a stock quote belongs to"""
         try:
-            # Check if stock price already exists for this symbol and date
-            check_sql = """
-            SELECT id FROM stock_prices 
-            WHERE symbol = %s AND DATE(scraped_date) = DATE(%s)
-            """
-            self.cur.execute(check_sql, (
-                item.get('symbol', ''),
-                item.get('scraped_date', '')
-            ))
-            result = self.cur.fetchone()
-            
-            if result:
-                # Update existing stock price
-                update_sql = """
-                UPDATE stock_prices 
-                SET price = %s, change_amount = %s, change_percent = %s,
-                    volume = %s, market_cap = %s, source = %s
-                WHERE symbol = %s AND DATE(scraped_date) = DATE(%s)
-                """
-                self.cur.execute(update_sql, (
-                    item.get('price', 0.0),
-                    item.get('change_amount', 0.0),
-                    item.get('change_percent', 0.0),
-                    item.get('volume', 0),
-                    item.get('market_cap', 0),
-                    item.get('source', ''),
-                    item.get('symbol', ''),
-                    item.get('scraped_date', '')
-                ))
-                spider.logger.info(f"Updated stock price for {item.get('symbol', '')}")
+            return datetime.strptime(item.get('scraped_date', ''), "%Y-%m-%d %H:%M:%S").date()
+        except (TypeError, ValueError):
+            return datetime.now().date()
+
+    def _flush_if_due(self, spider):
+        """Flush the buffers if nothing has been written for flush_interval seconds"""
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush(spider)
+
+    def flush(self, spider):
+        """Write all buffered items to the database"""
+        self._flush_news(spider)
+        self._flush_stocks(spider)
+        self.last_flush = time.monotonic()
+
+    def _flush_news(self, spider):
+        if not (self.news_buffer or self.duplicate_buffer):
+            return
+        # Size-triggered flushes restart the flush timer as well
+        self.last_flush = time.monotonic()
+        rows, self.news_buffer = self.news_buffer, []
+        fingerprints, self.fingerprint_buffer = self.fingerprint_buffer, []
+        duplicates, self.duplicate_buffer = self.duplicate_buffer, []
+        symbol_tags, self.symbol_buffer = self.symbol_buffer, []
+        redirects, self.redirect_buffer = self.redirect_buffer, {}
+
+        links = [row[NEWS_COLUMNS.index('link')] for row in rows]
+        orphans = []
+
+        def write():
+            # Duplicates of articles from an earlier batch that failed would break the foreign key
+            orphans.extend(self._orphaned_duplicates(duplicates, links))
+            kept = [row for row in duplicates if row not in orphans]
+
+            # Sentiment scoring is the costliest step of a flush, so it runs with the write, off the reactor
+            statements = self._news_statements(self._score_sentiment(rows), symbol_tags, fingerprints, kept)
+            saved = self._execute_batch(statements, spider, touch='financial_news')
+            # The batch is committed by now; related articles are best effort and never change the outcome
+            if saved and links and self.related:
+                self._update_related(links, spider)
+            return saved
+
+        def report(saved):
+            if saved:
+                kept = [row[0] for row in duplicates if row not in orphans]
+                spider.logger.info(f"Saved {len(rows)} articles and {len(kept)} duplicates to database")
+                self._mark_stored(spider, links + kept, redirects)
+                if orphans:
+                    self._report_failed_items(spider, 'duplicate article', [row[0] for row in orphans])
             else:
-                # Insert new stock price
-                insert_sql = """
-                INSERT INTO stock_prices 
-                (symbol, price, change_amount, change_percent, volume, market_cap, source, scraped_date) 
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                self.cur.execute(insert_sql, (
-                    item.get('symbol', ''),
-                    item.get('price', 0.0),
-                    item.get('change_amount', 0.0),
-                    item.get('change_percent', 0.0),
-                    item.get('volume', 0),
-                    item.get('market_cap', 0),
-                    item.get('source', ''),
-                    item.get('scraped_date', '')
-                ))
-                spider.logger.info(f"Saved new stock price for {item.get('symbol', '')}")
-                
-            self.conn.commit()
-            
-        except Error as e:
-            spider.logger.error(f"Error saving stock price to database: {e}")
-            
-        return item
\ No newline at end of file
+                self._report_failed_items(spider, 'article', links + [row[0] for row in duplicates])
+                self._forget_fingerprints([row[0] for row in fingerprints])
+
+        self._dispatch('news', write, report, spider)
+
+    def _news_statements(self, rows, symbol_tags, fingerprints, duplicates):
+        """Batched (sql, rows) statements that store a flushed news batch"""
+        statements = []
+        if rows:
+            # Articles are unique on link, so existing ones are updated in place
+            upsert_sql = self._upsert_sql('financial_news', NEWS_COLUMNS, len(rows), key_columns=('link',))
+            statements.append((upsert_sql, rows))
+
+            # Replace the symbol tags of these articles, resolving ids from links
+            links = [(row[NEWS_COLUMNS.index('link')],) for row in rows]
+            untag_sql = (
+                "DELETE FROM news_symbols WHERE news_id IN "
+                f"(SELECT id FROM financial_news WHERE link IN ({', '.join(['%s'] * len(links))}))"
+            )
+            statements.append((untag_sql, links))
+            if symbol_tags:
+                statements.append((tag_rows_sql(len(symbol_tags)), symbol_tags))
+        if fingerprints:
+            fingerprint_sql = self._upsert_sql('news_fingerprints', FINGERPRINT_COLUMNS, len(fingerprints), key_columns=('link',))
+            statements.append((fingerprint_sql, fingerprints))
+        if duplicates:
+            # Written after the articles so canonical links from the same batch already exist
+            duplicate_sql = self._upsert_sql('news_duplicates', DUPLICATE_COLUMNS, len(duplicates), key_columns=('link',))
+            statements.append((duplicate_sql, duplicates))
+
+        return statements
+
+    def _orphaned_duplicates(self, duplicates, links):
+        """Duplicates whose canonical article is neither in this batch nor stored
+
+        Runs on the write pool after earlier news batches have committed, so a
+        canonical article from a batch that failed is known to be missing.
+        """
+        batch_links = set(links)
+        canonical_links = list({row[1] for row in duplicates} - batch_links)
+        if not canonical_links:
+            return []
+        with self.engine.connect() as conn:
+            result = conn.exec_driver_sql(
+                f"SELECT link FROM financial_news WHERE link IN ({', '.join(['%s'] * len(canonical_links))})",
+                tuple(canonical_links)
+            )
+            stored = {link for (link,) in result}
+        return [row for row in duplicates if row[1] not in batch_links and row[1] not in stored]
+
+    def _forget_fingerprints(self, links):
+        """Drop the articles of a failed batch from the dedup index
+
+        Later copies of them are stored as articles again instead of being
+        linked to rows that do not exist.
+        """
+        if self.news_index is None:
+            return
+        for link in links:
+            self.news_index.remove(link)
+
+    def _score_sentiment(self, rows):
+        """Fill in missing sentiment scores for a batch of news rows in one vectorized pass"""
+        sentiment = NEWS_COLUMNS.index('sentiment')
+        unscored = [index for index, row in enumerate(rows) if row[sentiment] is None]
+        if not unscored:
+            return rows
+
+        if self.sentiment_scorer is None:
+            scores = [0.0] * len(unscored)
+        else:
+            text_columns = [NEWS_COLUMNS.index(column) for column in ('title', 'summary', 'content')]
+            scores = self.sentiment_scorer.score_many([
+                ' '.join(rows[index][column] or '' for column in text_columns) for index in unscored
+            ])
+
+        rows = list(rows)
+        for index, score in zip(unscored, scores):
+            row = list(rows[index])
+            row[sentiment] = float(score)
+            rows[index] = tuple(row)
+        return rows
+
+    def _update_related(self, links, spider):
+        """Score the stored articles against recent ones and store their related articles
+
+        Any failure is only logged: the articles are already committed, and
+        an error here must not report the batch as failed.
+        """
+        try:
+            pairs = self.related_index.update(self.engine, links)
+            spider.logger.info(f"Stored {pairs} related article links for {len(links)} articles")
+        except Exception as e:
+            spider.logger.error(f"Error updating related articles: {e}")
+
+    def _flush_stocks(self, spider):
+        if not self.stock_buffer:
+            return
+        self.last_flush = time.monotonic()
+        rows, self.stock_buffer = self.stock_buffer, []
+
+        # Keep one row per symbol and trading day; later quotes overwrite earlier ones
+        upsert_sql = self._upsert_sql('stock_prices', STOCK_COLUMNS, len(rows), key_columns=('symbol', 'trade_date'))
+
+        # Keep the one-row-per-symbol latest_quotes table in step with stock_prices
+        latest_rows = [row[:len(LATEST_QUOTE_COLUMNS)] for row in rows]
+        latest_sql = self._upsert_sql('latest_quotes', LATEST_QUOTE_COLUMNS, len(latest_rows), key_columns=('symbol',))
+
+        # Every quote is also appended to the intraday tick store; repeats of a tick are ignored
+        tick_sql = self._insert_ignore_sql('stock_ticks', TICK_COLUMNS, len(latest_rows))
+
+        statements = [(upsert_sql, rows), (latest_sql, latest_rows), (tick_sql, latest_rows)]
+
+        def report(saved):
+            if saved:
+                spider.logger.info(f"Saved {len(rows)} stock prices to database")
+            else:
+                self._report_failed_items(spider, 'stock price', [f"{row[0]} at {row[7]}" for row in rows])
+
+        self._dispatch('stocks', lambda: self._execute_batch(statements, spider, touch='stock_prices'), report, spider)
+
+    def _dispatch(self, kind, write, report, spider):
+        """Run a write now, or queue it on the write pool behind earlier writes of the same kind
+
+        report is called on the reactor thread with the write's result.
+        """
+        if self.thread_pool is None:
+            try:
+                saved = write()
+            except Exception as e:
+                spider.logger.error(f"Database write failed: {e}")
+                saved = False
+            report(saved)
+            return
+
+        self.pending_writes += 1
+        finished = defer.Deferred()
+        d = self.write_locks[kind].run(threads.deferToThreadPool, reactor, self.thread_pool, write)
+        # Writes that raise are reported like batches that failed to commit
+        d.addCallbacks(report, self._write_failed, errbackArgs=(report, spider))
+        d.addErrback(lambda failure: spider.logger.error(f"Could not report database write: {failure.getErrorMessage()}"))
+        d.addBoth(self._write_finished, finished)
+        self.last_write = finished
+
+    def _write_failed(self, failure, report, spider):
+        spider.logger.error(f"Database write failed: {failure.getErrorMessage()}")
+        report(False)
+
+    def _write_finished(self, _, finished):
+        self.pending_writes -= 1
+        finished.callback(None)
+        self._notify_writers()
+
+    def _notify_writers(self):
+        """Release items waiting for queue space, and close_spider once nothing is pending"""
+        while self.capacity_waiters and self.pending_writes < self.max_pending_writes:
+            self.capacity_waiters.pop(0).callback(None)
+        if not self.pending_writes:
+            while self.drain_waiters:
+                self.drain_waiters.pop(0).callback(None)
+
+    def _mark_stored(self, spider, links, redirects):
+        """Let a spider with crawl state skip these links, and the URLs that redirected to them, from now on"""
+        article_stored = getattr(spider, 'article_stored', None)
+        if article_stored is not None:
+            for link in links:
+                article_stored(link, redirects.get(link, ()))
+
+    def _report_failed_items(self, spider, kind, keys):
+        """Log each item of a failed batch so losses can be traced to single articles or quotes"""
+        for key in keys:
+            spider.logger.error(f"Could not save {kind}: {key}")
+        crawler = getattr(spider, 'crawler', None)
+        if crawler is not None:
+            crawler.stats.inc_value('pipeline/failed_items', len(keys), spider=spider)
+
+    def _upsert_sql(self, table, columns, row_count, key_columns=()):
+        """Build a multi-row INSERT ... ON DUPLICATE KEY UPDATE statement"""
+        placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        updates = ', '.join(f"{column} = VALUES({column})" for column in columns if column not in key_columns)
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES {', '.join([placeholders] * row_count)} "
+            f"ON DUPLICATE KEY UPDATE {updates}"
+        )
+
+    def _insert_ignore_sql(self, table, columns, row_count):
+        """Build a multi-row INSERT IGNORE statement for append-only tables"""
+        placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        return (
+            f"INSERT IGNORE INTO {table} ({', '.join(columns)}) "
+            f"VALUES {', '.join([placeholders] * row_count)}"
+        )
+
+    def _execute_batch(self, statements, spider, touch=None):
+        """Execute batched (sql, rows) statements in one transaction with a single commit
+
+        When touch is given, the table's data_versions counter is bumped in the
+        same transaction so the web app can invalidate its caches.
+        """
+        item_count = sum(len(rows) for sql, rows in statements)
+        if self.engine is None:
+            spider.logger.error(f"No database connection available, dropping {item_count} buffered rows")
+            return False
+
+        try:
+            # Check a connection out of the pool only for the duration of the write
+            with self.engine.begin() as conn:
+                for sql, rows in statements:
+                    conn.exec_driver_sql(sql, tuple(value for row in rows for value in row))
+                if touch:
+                    conn.exec_driver_sql(TOUCH_VERSION_SQL, (touch,))
+            return True
+        except SQLAlchemyError as e:
+            spider.logger.error(f"Error saving {item_count} buffered rows to database: {e}")
+            return False
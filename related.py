@@ -0,0 +1,250 @@
+"""Precomputed related articles for the news detail page
+
+When the pipeline stores a batch of articles, each stored article is
+scored against the most recent articles with TF-IDF cosine similarity over
+title and summary. The whole batch is scored at once as a single matrix
+product. The best matches are written to related_news in both directions,
+and every article keeps at most RELATED_PER_ARTICLE of them, so the detail
+page only needs one indexed lookup. The pipeline keeps the tokenized pool
+and its document frequencies between batches.
+
+Rebuild for the recent window with:  python related.py rebuild
+"""
+import os
+import re
+import sys
+import math
+import time
+import argparse
+import logging
+from collections import Counter
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r'[a-z][a-z0-9]+')
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just more most my
+myself new no nor not now of off on once only or other our ours ourselves out over own same says said
+she should so some such than that the their theirs them themselves then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would year years you your yours yourself yourselves
+""".split())
+
+RELATED_POOL_SIZE = int(os.environ.get('RELATED_POOL_SIZE', 3000))
+RELATED_PER_ARTICLE = 5
+RELATED_POOL_RELOAD_SECONDS = 3600
+RELATED_MIN_SCORE = 0.1
+REBUILD_CHUNK_SIZE = 200
+
+RELATED_COLUMNS = ('news_id', 'related_id', 'score')
+
+
+def tokenize(text):
+    """Lowercase content words of a text, without stopwords"""
+    return [word for word in WORD_RE.findall((text or '').lower()) if word not in STOPWORDS]
+
+
+def score_related(queries, pool, top_k=RELATED_PER_ARTICLE, min_score=RELATED_MIN_SCORE, document_frequency=None):
+    """Find the most similar pool articles for each query article
+
+    queries and pool are lists of (id, tokens); query articles should be part
+    of the pool so the IDF weights cover them. document_frequency may be
+    passed when the caller already keeps it for the pool. Returns (query_id,
+    pool_id, score) tuples, at most top_k per query article.
+    """
+    if not queries or not pool:
+        return []
+
+    # Inverse document frequency over the pool
+    if document_frequency is None:
+        document_frequency = Counter()
+        for _, tokens in pool:
+            document_frequency.update(set(tokens))
+    pool_count = len(pool)
+    idf = {term: math.log((1 + pool_count) / (1 + count)) + 1 for term, count in document_frequency.items()}
+
+    # Only terms used by the query articles can contribute to a dot product
+    vocabulary = {term: column for column, term in enumerate(sorted({t for _, tokens in queries for t in tokens}))}
+    if not vocabulary:
+        return []
+
+    query_matrix = np.zeros((len(queries), len(vocabulary)), dtype=np.float32)
+    for row, (_, tokens) in enumerate(queries):
+        for term, count in Counter(tokens).items():
+            query_matrix[row, vocabulary[term]] = count * idf.get(term, 1.0)
+
+    pool_matrix = np.zeros((pool_count, len(vocabulary)), dtype=np.float32)
+    pool_norms = np.zeros(pool_count, dtype=np.float32)
+    for row, (_, tokens) in enumerate(pool):
+        weights = {term: count * idf[term] for term, count in Counter(tokens).items()}
+        pool_norms[row] = math.sqrt(sum(weight * weight for weight in weights.values()))
+        for term, weight in weights.items():
+            column = vocabulary.get(term)
+            if column is not None:
+                pool_matrix[row, column] = weight
+
+    query_norms = np.linalg.norm(query_matrix, axis=1)
+    denominator = np.outer(query_norms, pool_norms)
+    scores = np.divide(query_matrix @ pool_matrix.T, denominator,
+                       out=np.zeros_like(denominator), where=denominator > 0)
+
+    # An article is never related to itself
+    query_ids = np.array([query_id for query_id, _ in queries])
+    pool_ids = np.array([pool_id for pool_id, _ in pool])
+    scores[query_ids[:, None] == pool_ids[None, :]] = 0
+
+    top_k = min(top_k, pool_count)
+    best = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+
+    results = []
+    for row, columns in enumerate(best):
+        for column in columns[np.argsort(-scores[row, columns])]:
+            score = float(scores[row, column])
+            if score >= min_score:
+                results.append((int(query_ids[row]), int(pool_ids[column]), round(score, 4)))
+    return results
+
+
+def _load_pool(conn, pool_size):
+    rows = conn.exec_driver_sql(
+        f"SELECT id, title, summary FROM financial_news ORDER BY id DESC LIMIT {int(pool_size)}"
+    ).fetchall()
+    return [(news_id, tokenize(f"{title or ''} {summary or ''}")) for news_id, title, summary in rows]
+
+
+def _trim_related(conn, news_ids, keep=RELATED_PER_ARTICLE):
+    """Delete all but the best `keep` related rows of the given articles"""
+    news_ids = list(news_ids)
+    if not news_ids:
+        return
+    rows = conn.exec_driver_sql(
+        f"SELECT news_id, related_id FROM related_news WHERE news_id IN ({', '.join(['%s'] * len(news_ids))}) "
+        "ORDER BY news_id, score DESC, related_id",
+        tuple(news_ids)
+    ).fetchall()
+    kept = Counter()
+    extra = []
+    for news_id, related_id in rows:
+        kept[news_id] += 1
+        if kept[news_id] > keep:
+            extra.append((news_id, related_id))
+    if extra:
+        conn.exec_driver_sql(
+            f"DELETE FROM related_news WHERE (news_id, related_id) IN ({', '.join(['(%s, %s)'] * len(extra))})",
+            tuple(value for pair in extra for value in pair)
+        )
+
+
+def _write_related(conn, pairs, chunk_size=500):
+    """Upsert related pairs in both directions, keeping the best RELATED_PER_ARTICLE per article"""
+    rows = list({(a, b): score for a, b, score in pairs + [(b, a, score) for a, b, score in pairs]}.items())
+    placeholders = '(' + ', '.join(['%s'] * len(RELATED_COLUMNS)) + ')'
+    for offset in range(0, len(rows), chunk_size):
+        chunk = rows[offset:offset + chunk_size]
+        sql = (
+            f"INSERT INTO related_news ({', '.join(RELATED_COLUMNS)}) "
+            f"VALUES {', '.join([placeholders] * len(chunk))} "
+            f"ON DUPLICATE KEY UPDATE score = VALUES(score)"
+        )
+        conn.exec_driver_sql(sql, tuple(value for (a, b), score in chunk for value in (a, b, score)))
+
+    # Reverse pairs would otherwise pile up on popular older articles
+    _trim_related(conn, {b for a, b, score in pairs})
+    return len(rows)
+
+
+class RelatedIndex:
+    """Tokenized pool of recent articles and its document frequencies, kept between batches
+
+    The pool is loaded once and then updated with each stored batch. Stored
+    articles are fetched by id, so an older article that was crawled again
+    is scored too even though it is not among the newest pool_size rows.
+    The pool is reloaded every reload_seconds to pick up other writers.
+    """
+
+    def __init__(self, pool_size=RELATED_POOL_SIZE, reload_seconds=RELATED_POOL_RELOAD_SECONDS):
+        self.pool_size = pool_size
+        self.reload_seconds = reload_seconds
+        self.tokens = {}
+        self.document_frequency = Counter()
+        self.loaded_at = None
+
+    def _add(self, news_id, tokens):
+        self._remove(news_id)
+        self.tokens[news_id] = tokens
+        self.document_frequency.update(set(tokens))
+
+    def _remove(self, news_id):
+        tokens = self.tokens.pop(news_id, None)
+        if tokens is not None:
+            self.document_frequency.subtract(set(tokens))
+
+    def _load(self, conn):
+        self.tokens = {}
+        self.document_frequency = Counter()
+        for news_id, tokens in _load_pool(conn, self.pool_size):
+            self._add(news_id, tokens)
+        self.loaded_at = time.monotonic()
+
+    def _evict(self):
+        """Drop the oldest articles once the pool outgrows pool_size"""
+        excess = len(self.tokens) - self.pool_size
+        if excess > 0:
+            for news_id in sorted(self.tokens)[:excess]:
+                self._remove(news_id)
+            self.document_frequency += Counter()
+
+    def update(self, engine, links):
+        """Compute and store related articles for the articles with the given links"""
+        if not links:
+            return 0
+
+        with engine.begin() as conn:
+            if self.loaded_at is None or time.monotonic() - self.loaded_at >= self.reload_seconds:
+                self._load(conn)
+
+            rows = conn.exec_driver_sql(
+                f"SELECT id, title, summary FROM financial_news WHERE link IN ({', '.join(['%s'] * len(links))})",
+                tuple(links)
+            ).fetchall()
+            queries = [(news_id, tokenize(f"{title or ''} {summary or ''}")) for news_id, title, summary in rows]
+            for news_id, tokens in queries:
+                self._add(news_id, tokens)
+
+            pairs = score_related(queries, list(self.tokens.items()), document_frequency=self.document_frequency)
+            if pairs:
+                _write_related(conn, pairs)
+            self._evict()
+        return len(pairs)
+
+
+def rebuild_related(engine, pool_size=RELATED_POOL_SIZE):
+    """Recompute related articles for every article in the recent pool"""
+    with engine.begin() as conn:
+        pool = _load_pool(conn, pool_size)
+        if not pool:
+            return 0
+        conn.exec_driver_sql("DELETE FROM related_news WHERE news_id >= %s", (min(news_id for news_id, _ in pool),))
+        written = 0
+        for offset in range(0, len(pool), REBUILD_CHUNK_SIZE):
+            pairs = score_related(pool[offset:offset + REBUILD_CHUNK_SIZE], pool)
+            if pairs:
+                written += _write_related(conn, pairs)
+    logger.info(f"Stored {written} related article links for {len(pool)} articles")
+    return written
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description='Related article index')
+    parser.add_argument('command', choices=['rebuild'])
+    args = parser.parse_args()
+
+    from database import get_engine
+    rebuild_related(get_engine())
@@ -0,0 +1,185 @@
+"""Content relevance analysis of stored news articles
+
+Classifies articles into relevance categories by keyword. All keywords
+are matched in one pass with a single compiled pattern. Articles are
+streamed from the database in chunks with a server-side cursor and
+classified in a process pool. The category of every analysed article is
+stored in news_categories.
+
+Run over the whole archive:   python relevance.py analyze
+Run over a random sample:     python relevance.py analyze --sample 1000
+"""
+import os
+import re
+import sys
+import random
+import argparse
+import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+RELEVANCE_CATEGORIES = {
+    'investment': ['stocks', 'bonds', 'invest', 'portfolio', 'dividend', 'yield'],
+    'market_analysis': ['market', 'trend', 'analysis', 'forecast', 'prediction'],
+    'company_performance': ['earnings', 'revenue', 'profit', 'loss', 'performance'],
+    'economic_indicators': ['gdp', 'inflation', 'unemployment', 'interest rate', 'fed'],
+    'irrelevant': ['celebrity', 'entertainment', 'sports', 'weather', 'politics'],
+}
+
+UNCATEGORIZED = 'uncategorized'
+
+CHUNK_SIZE = 2000
+WORKERS = int(os.environ.get('RELEVANCE_WORKERS', os.cpu_count() or 1))
+
+CATEGORY_COLUMNS = ('news_id', 'category', 'score', 'analyzed_at')
+
+
+class RelevanceClassifier:
+    """Scores text against every category with one compiled multi-keyword pattern
+
+    A category's score is the number of its distinct keywords found at the
+    start of a word, so "invest" also matches "investors".
+    """
+
+    def __init__(self, categories=RELEVANCE_CATEGORIES):
+        self.categories = list(categories)
+        self.keyword_category = {
+            keyword: category for category, keywords in categories.items() for keyword in keywords
+        }
+        keywords = sorted(self.keyword_category, key=len, reverse=True)
+        self.pattern = re.compile(r'\b(?:' + '|'.join(re.escape(keyword) for keyword in keywords) + ')')
+
+    def classify(self, text):
+        """Return (best category, its score); ties go to the category listed first"""
+        found = set(self.pattern.findall((text or '').lower()))
+        if not found:
+            return UNCATEGORIZED, 0
+
+        scores = Counter(self.keyword_category[keyword] for keyword in found)
+        best = max(self.categories, key=lambda category: scores.get(category, 0))
+        return best, scores[best]
+
+
+_classifier = None
+
+
+def _init_worker():
+    global _classifier
+    _classifier = RelevanceClassifier()
+
+
+def classify_chunk(rows):
+    """Classify (id, title, summary, content) rows; runs inside a pool worker"""
+    return [
+        (news_id,) + _classifier.classify(' '.join(part for part in (title, summary, content) if part))
+        for news_id, title, summary, content in rows
+    ]
+
+
+def sample_ids(conn, sample_size, max_rounds=10):
+    """Draw a uniform random sample of article ids without sorting the table
+
+    Random ids are drawn between the smallest and largest id and looked up
+    through the primary key; ids that no longer exist are simply redrawn.
+    """
+    low, high = conn.exec_driver_sql("SELECT MIN(id), MAX(id) FROM financial_news").fetchone()
+    if low is None:
+        return []
+
+    population = high - low + 1
+    sample = set()
+    for _ in range(max_rounds):
+        missing = sample_size - len(sample)
+        if missing <= 0 or len(sample) >= population:
+            break
+        candidates = set(random.sample(range(low, high + 1), min(population, missing * 2))) - sample
+        if not candidates:
+            continue
+        placeholders = ', '.join(['%s'] * len(candidates))
+        found = [row[0] for row in conn.exec_driver_sql(
+            f"SELECT id FROM financial_news WHERE id IN ({placeholders})", tuple(candidates)
+        )]
+        # The lookup returns ids in key order, so keep a random subset rather than the lowest ones
+        sample.update(random.sample(found, min(missing, len(found))))
+    return sorted(sample)
+
+
+def _article_chunks(conn, ids=None, chunk_size=CHUNK_SIZE):
+    """Yield lists of (id, title, summary, content) rows"""
+    if ids is not None:
+        for offset in range(0, len(ids), chunk_size):
+            chunk = ids[offset:offset + chunk_size]
+            yield conn.exec_driver_sql(
+                "SELECT id, title, summary, content FROM financial_news "
+                f"WHERE id IN ({', '.join(['%s'] * len(chunk))})", tuple(chunk)
+            ).fetchall()
+        return
+
+    # Server-side cursor, so the archive is never held in memory at once
+    result = conn.execution_options(stream_results=True).exec_driver_sql(
+        "SELECT id, title, summary, content FROM financial_news"
+    )
+    for rows in result.partitions(chunk_size):
+        yield [tuple(row) for row in rows]
+
+
+def _store_categories(engine, results):
+    analyzed_at = datetime.now()
+    placeholders = '(' + ', '.join(['%s'] * len(CATEGORY_COLUMNS)) + ')'
+    sql = (
+        f"INSERT INTO news_categories ({', '.join(CATEGORY_COLUMNS)}) "
+        f"VALUES {', '.join([placeholders] * len(results))} "
+        "ON DUPLICATE KEY UPDATE category = VALUES(category), score = VALUES(score), analyzed_at = VALUES(analyzed_at)"
+    )
+    with engine.begin() as conn:
+        conn.exec_driver_sql(sql, tuple(value for row in results for value in row + (analyzed_at,)))
+
+
+def analyze_relevance(engine, sample_size=None, workers=WORKERS, store=True):
+    """Classify the whole archive, or a random sample of it, and report category shares"""
+    totals = Counter()
+    with engine.connect() as read_conn, ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        ids = sample_ids(read_conn, sample_size) if sample_size else None
+        pending = []
+        for rows in _article_chunks(read_conn, ids):
+            pending.append(pool.submit(classify_chunk, rows))
+
+            # Keep a bounded number of chunks in flight so memory stays flat
+            if len(pending) >= workers * 2:
+                totals.update(_collect(engine, pending.pop(0).result(), store))
+        for future in pending:
+            totals.update(_collect(engine, future.result(), store))
+
+    analyzed = sum(totals.values())
+    relevant = analyzed - totals['irrelevant'] - totals[UNCATEGORIZED]
+    percent_relevant = relevant / analyzed * 100 if analyzed else 0.0
+
+    logger.info(f"Content relevance analysis of {analyzed} articles:")
+    for category in list(RELEVANCE_CATEGORIES) + [UNCATEGORIZED]:
+        logger.info(f"  {category}: {totals[category]} articles ({totals[category] / max(analyzed, 1) * 100:.1f}%)")
+    logger.info(f"Total relevant to financial decision-making: {percent_relevant:.1f}%")
+    return dict(totals), percent_relevant
+
+
+def _collect(engine, results, store):
+    if store and results:
+        _store_categories(engine, results)
+    return Counter(category for _, category, _ in results)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description='News content relevance analysis')
+    parser.add_argument('command', choices=['analyze'])
+    parser.add_argument('--sample', type=int, help='analyse a random sample of this many articles')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='worker processes')
+    parser.add_argument('--dry-run', action='store_true', help='report without storing categories')
+    args = parser.parse_args()
+
+    from database import get_engine
+    analyze_relevance(get_engine(), sample_size=args.sample, workers=args.workers, store=not args.dry_run)
@@ -1,74 +1,85 @@
 import os
 import sys
 import subprocess
-from threading import Thread
 import time
 import schedule
+from timeseries import run_rollups, apply_retention
+from crawler_service import CrawlerService, STOCK_CRAWL_INTERVAL, NEWS_CRAWL_INTERVAL
 
-def run_flask():
-    os.chdir('web_app')
+def start_web_server():
+    """Start the web app in its own process with the server selected by WEB_SERVER"""
+    web_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web_app')
+    return subprocess.Popen([sys.executable, 'serve.py'], cwd=web_dir)
+
+def stop_web_server(process, timeout=35):
+    """Ask the web server to shut down gracefully, killing it if it takes too long"""
+    if process.poll() is not None:
+        return
+    process.terminate()
     try:
-        subprocess.run(['python', 'app.py'], check=True)
-    except KeyboardInterrupt:
-        print("Flask server stopped")
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        print("Web server killed after graceful shutdown timed out")
 
-def run_financial_news_spider():
+def run_stock_rollups():
     try:
-        print("Running Financial News spider...")
-        subprocess.run(['python', '-m', 'scrapy', 'crawl', 'financial_news'], check=True)
-        print("Financial News spider completed")
-    except subprocess.CalledProcessError as e:
-        print(f"Error running Financial News spider: {e}")
+        print("Running stock price rollups...")
+        run_rollups()
+        print("Stock price rollups completed")
+    except Exception as e:
+        print(f"Error running stock price rollups: {e}")
 
-def run_stock_prices_spider():
+def run_tick_retention():
     try:
-        print("Running Stock Prices spider...")
-        subprocess.run(['python', '-m', 'scrapy', 'crawl', 'stock_prices'], check=True)
-        print("Stock Prices spider completed")
-    except subprocess.CalledProcessError as e:
-        print(f"Error running Stock Prices spider: {e}")
+        print("Pruning old stock ticks...")
+        from database import get_engine
+        apply_retention(get_engine())
+        print("Stock tick pruning completed")
+    except Exception as e:
+        print(f"Error pruning stock ticks: {e}")
+
+def run_relevance_analysis():
+    # Separate process: forking a worker pool from the reactor's threads is unsafe
+    print("Analyzing news content relevance...")
+    result = subprocess.run([sys.executable, 'relevance.py', 'analyze'],
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode:
+        print(f"Content relevance analysis failed with exit code {result.returncode}")
+    else:
+        print("Content relevance analysis completed")
+
+def schedule_spiders(service):
+    """Set up scheduled runs for the spiders and maintenance jobs"""
+    # Run both spiders immediately on startup, then stock prices every 3 minutes
+    # (more frequent updates for price data) and news every 2 hours
+    service.schedule_spider('financial_news', NEWS_CRAWL_INTERVAL)
+    service.schedule_spider('stock_prices', STOCK_CRAWL_INTERVAL)
 
-def run_all_spiders():
-    """Run all spiders sequentially"""
-    run_financial_news_spider()
-    run_stock_prices_spider()
+    # Roll intraday ticks up into hourly/daily bars and prune old ticks
+    schedule.every(15).minutes.do(run_stock_rollups)
+    schedule.every().day.at("03:00").do(run_tick_retention)
 
-def schedule_spiders():
-    """Set up scheduled runs for the spiders"""
-    # Run stock prices spider every 30 minutes (more frequent updates for price data)
-    schedule.every(3).minutes.do(run_stock_prices_spider)
-    
-    # Run news spider every 2 hours
-    schedule.every(2).hours.do(run_financial_news_spider)
-    
-    # Run both immediately on startup
-    run_all_spiders()
-    
-    # Keep checking the schedule
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+    # Categorize the whole news archive nightly
+    schedule.every().day.at("02:00").do(run_relevance_analysis)
+
+    # Check the schedule every minute off the reactor thread
+    service.schedule_job(schedule.run_pending, 60)
 
 if __name__ == '__main__':
-    # Start Flask in a separate thread
-    flask_thread = Thread(target=run_flask)
-    flask_thread.daemon = True  # This thread will close when the main program ends
-    flask_thread.start()
-    
-    # Give Flask a moment to start
+    # Start the web server in its own process
+    web_server = start_web_server()
+
+    # Give the web server a moment to start
     time.sleep(2)
-    
-    print("Flask server is running")
-    
-    # Start the scheduler in a separate thread
-    scheduler_thread = Thread(target=schedule_spiders)
-    scheduler_thread.daemon = True
-    scheduler_thread.start()
-    
-    # Keep the main thread running to keep Flask alive
-    try:
-        while True:
-            time.sleep(10)
-    except KeyboardInterrupt:
-        print("Shutting down...")
-        sys.exit(0)
\ No newline at end of file
+
+    print("Web server is running")
+
+    # Spiders run in this process on a long-lived reactor until interrupted
+    service = CrawlerService()
+    schedule_spiders(service)
+    service.run()
+
+    print("Shutting down...")
+    stop_web_server(web_server)
+    sys.exit(0)
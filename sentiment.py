@@ -0,0 +1,129 @@
+"""Lexicon-based sentiment scores for financial news
+
+Scores come from a finance word list in the spirit of Loughran-McDonald:
+positive and negative terms are counted, with a term's polarity flipped
+when a negation appears up to three words before it. A whole batch of
+articles is scored at once by turning every token into an array index and
+counting with numpy, so scoring keeps up with the pipeline's flushes.
+
+Score stored articles with:  python sentiment.py backfill [--all]
+"""
+import os
+import re
+import sys
+import argparse
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+POSITIVE_TERMS = """
+beat beats boost boosted boosting bullish climb climbed climbs confident exceed exceeded exceeds expand
+expanded expansion gain gained gains growth improve improved improvement improves jump jumped outperform
+outperformed optimism optimistic profit profitable profits rally rallied rallies rebound rebounded record
+recover recovered recovery rise rises rising robust soar soared soaring strong stronger strength surge
+surged surges upbeat upgrade upgraded upside win winning wins success successful positive favorable
+""".split()
+
+NEGATIVE_TERMS = """
+bankrupt bankruptcy bearish concern concerns crash crashed decline declined declines declining default
+deficit downgrade downgraded downturn drop dropped drops fall falling falls fear fears fell fraud halt
+investigation lawsuit layoffs lose loses losing loss losses miss missed misses negative plunge plunged
+plunges recession risk risks selloff shortfall slump slumped slowdown slow slowing tumble tumbled
+uncertainty underperform volatile volatility warn warned warning weak weaker weakness worse worst cut cuts
+""".split()
+
+NEGATIONS = ("not", "no", "never", "without", "isn't", "wasn't", "aren't", "didn't", "doesn't", "don't", "won't")
+
+NEGATION_WINDOW = 3
+
+
+class SentimentScorer:
+    """Scores texts in [-1, 1]: (positive - negative) / (positive + negative)"""
+
+    def __init__(self, positive=POSITIVE_TERMS, negative=NEGATIVE_TERMS, negations=NEGATIONS):
+        # Token ids: 0 is any other word, then negations, then lexicon terms
+        self.token_ids = {}
+        polarity = [0.0]
+        for word in negations:
+            self.token_ids[word] = len(polarity)
+            polarity.append(0.0)
+        self.negation_ids = np.arange(1, len(polarity))
+        for words, value in ((positive, 1.0), (negative, -1.0)):
+            for word in words:
+                self.token_ids[word] = len(polarity)
+                polarity.append(value)
+        self.polarity = np.array(polarity)
+
+    def score_many(self, texts):
+        """Return an array with one score per text"""
+        doc_count = len(texts)
+        if not doc_count:
+            return np.array([])
+
+        # Map every token of the batch to its id, remembering which text it came from
+        ids, docs = [], []
+        get_id = self.token_ids.get
+        for doc, text in enumerate(texts):
+            tokens = [get_id(token, 0) for token in TOKEN_RE.findall((text or '').lower())]
+            ids.extend(tokens)
+            docs.extend([doc] * len(tokens))
+        if not ids:
+            return np.zeros(doc_count)
+        ids = np.array(ids)
+        docs = np.array(docs)
+
+        # Flip a term's polarity when a negation precedes it within the same text
+        is_negation = np.isin(ids, self.negation_ids)
+        flipped = np.zeros(len(ids), dtype=bool)
+        for offset in range(1, NEGATION_WINDOW + 1):
+            flipped[offset:] |= is_negation[:-offset] & (docs[offset:] == docs[:-offset])
+        values = self.polarity[ids] * np.where(flipped, -1.0, 1.0)
+
+        positive = np.bincount(docs, weights=values > 0, minlength=doc_count)
+        negative = np.bincount(docs, weights=values < 0, minlength=doc_count)
+        total = positive + negative
+        return np.round(np.divide(positive - negative, total, out=np.zeros(doc_count), where=total > 0), 3)
+
+    def score(self, text):
+        return float(self.score_many([text])[0])
+
+
+def backfill_sentiment(engine, rescore_all=False, batch_size=1000):
+    """Score stored articles; by default only those still at the 0 default"""
+    scorer = SentimentScorer()
+    sql = "SELECT id, title, summary, content FROM financial_news"
+    if not rescore_all:
+        sql += " WHERE sentiment IS NULL OR sentiment = 0"
+
+    updated = 0
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).exec_driver_sql(sql)
+        for rows in result.partitions(batch_size):
+            scores = scorer.score_many([
+                ' '.join(part for part in (title, summary, content) if part) for _, title, summary, content in rows
+            ])
+            with engine.begin() as write_conn:
+                write_conn.exec_driver_sql(
+                    "UPDATE financial_news SET sentiment = %s WHERE id = %s",
+                    [(float(score), row[0]) for score, row in zip(scores, rows)]
+                )
+            updated += len(rows)
+
+    logger.info(f"Scored sentiment of {updated} articles")
+    return updated
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description='News sentiment scoring')
+    parser.add_argument('command', choices=['backfill'])
+    parser.add_argument('--all', action='store_true', help='rescore every article, not only unscored ones')
+    args = parser.parse_args()
+
+    from database import get_engine
+    backfill_sentiment(get_engine(), rescore_all=args.all)
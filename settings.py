@@ -9,6 +9,38 @@ ITEM_PIPELINES = {
    'investor_info.pipelines.DatabasePipeline': 300,
 }
 
+# Buffer items in the pipeline and write them as multi-row upserts
+DB_BUFFERED_WRITES = True
+DB_BATCH_SIZE = 100
+DB_FLUSH_INTERVAL = 30  # seconds
+
+# Run database writes on a small thread pool instead of the reactor thread; item
+# processing waits only once DB_MAX_PENDING_WRITES batches are queued
+DB_ASYNC_WRITES = True
+DB_WRITE_THREADS = 2
+DB_MAX_PENDING_WRITES = 4
+
+# Link near-duplicate (syndicated) articles to the first stored copy instead of storing them again
+DEDUP_ENABLED = True
+DEDUP_THRESHOLD = 0.8  # estimated Jaccard similarity of word shingles
+DEDUP_WINDOW_DAYS = 30
+
+# Precompute related articles (TF-IDF over title and summary) when articles are stored
+RELATED_ENABLED = True
+
+# Score article sentiment with the finance lexicon when the spider did not set one
+SENTIMENT_ENABLED = True
+
+# Revalidate listing pages with ETag/Last-Modified between crawls
+DOWNLOADER_MIDDLEWARES = {
+   'investor_info.middlewares.ConditionalRequestMiddleware': 560,
+}
+
+# Incremental news crawling: state kept between runs and article age cutoff
+CRAWL_STATE_DIR = '.crawl_state'
+CRAWL_SEEN_TTL_DAYS = 90
+NEWS_MAX_AGE_DAYS = 7
+
 # Obey robots.txt rules
 ROBOTSTXT_OBEY = False
 
@@ -16,7 +16,8 @@ CREATE TABLE IF NOT EXISTS financial_news (
     source VARCHAR(100),
     publish_date VARCHAR(100),
     sentiment FLOAT DEFAULT 0,
-    scraped_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    -- NOT NULL so keyset pagination over (scraped_date, id) reaches every row
+    scraped_date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -41,6 +42,58 @@ CREATE TABLE IF NOT EXISTS bookmarks (
     UNIQUE KEY user_news_unique (user_id, news_id)
 );
 
+-- MinHash signature of every stored article, used to detect syndicated copies
+CREATE TABLE IF NOT EXISTS news_fingerprints (
+    link VARCHAR(512) PRIMARY KEY,
+    minhash BLOB NOT NULL,
+    created_at DATETIME NOT NULL,
+    INDEX idx_news_fingerprints_created (created_at)
+);
+
+-- Syndicated copies of stored articles, linked to the first stored copy instead of stored again
+CREATE TABLE IF NOT EXISTS news_duplicates (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    link VARCHAR(512) UNIQUE NOT NULL,
+    canonical_link VARCHAR(512) NOT NULL,
+    title VARCHAR(255),
+    source VARCHAR(100),
+    similarity FLOAT,
+    scraped_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (canonical_link) REFERENCES financial_news(link) ON DELETE CASCADE,
+    INDEX idx_news_duplicates_canonical (canonical_link)
+);
+
+-- Related articles precomputed at ingest time, read by the news detail page
+CREATE TABLE IF NOT EXISTS related_news (
+    news_id INT NOT NULL,
+    related_id INT NOT NULL,
+    score FLOAT NOT NULL,
+    PRIMARY KEY (news_id, related_id),
+    INDEX idx_related_news_score (news_id, score),
+    FOREIGN KEY (news_id) REFERENCES financial_news(id) ON DELETE CASCADE,
+    FOREIGN KEY (related_id) REFERENCES financial_news(id) ON DELETE CASCADE
+);
+
+-- Tracked symbols mentioned by each article, tagged by the pipeline
+CREATE TABLE IF NOT EXISTS news_symbols (
+    news_id INT NOT NULL,
+    symbol VARCHAR(10) NOT NULL,
+    mentions INT NOT NULL DEFAULT 1,
+    PRIMARY KEY (news_id, symbol),
+    INDEX idx_news_symbols_symbol (symbol, news_id),
+    FOREIGN KEY (news_id) REFERENCES financial_news(id) ON DELETE CASCADE
+);
+
+-- Relevance category of each article, from the nightly relevance analysis
+CREATE TABLE IF NOT EXISTS news_categories (
+    news_id INT PRIMARY KEY,
+    category VARCHAR(30) NOT NULL,
+    score INT NOT NULL DEFAULT 0,
+    analyzed_at DATETIME NOT NULL,
+    INDEX idx_news_categories_category (category, news_id),
+    FOREIGN KEY (news_id) REFERENCES financial_news(id) ON DELETE CASCADE
+);
+
 -- Create stock_prices table
 CREATE TABLE IF NOT EXISTS stock_prices (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -52,9 +105,80 @@ CREATE TABLE IF NOT EXISTS stock_prices (
     market_cap BIGINT,
     source VARCHAR(100),
     scraped_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-    UNIQUE KEY symbol_date_unique (symbol, scraped_date)
+    trade_date DATE,
+    -- The only unique key, so the pipeline's ON DUPLICATE KEY UPDATE upserts are unambiguous
+    UNIQUE KEY symbol_trade_date_unique (symbol, trade_date)
 );
 
+-- Create stock_ticks table (append-only intraday quotes)
+CREATE TABLE IF NOT EXISTS stock_ticks (
+    symbol VARCHAR(10) NOT NULL,
+    ts DATETIME NOT NULL,
+    price DECIMAL(10,2),
+    change_amount DECIMAL(10,2),
+    change_percent DECIMAL(10,2),
+    volume BIGINT,
+    market_cap BIGINT,
+    source VARCHAR(100),
+    PRIMARY KEY (symbol, ts),
+    INDEX idx_stock_ticks_ts (ts)
+);
+
+-- Create hourly and daily OHLC rollup tables (built by timeseries.py)
+CREATE TABLE IF NOT EXISTS stock_bars_hourly (
+    symbol VARCHAR(10) NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    open DECIMAL(10,2),
+    high DECIMAL(10,2),
+    low DECIMAL(10,2),
+    close DECIMAL(10,2),
+    volume BIGINT,
+    tick_count INT,
+    PRIMARY KEY (symbol, bucket_start),
+    INDEX idx_stock_bars_hourly_start (bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS stock_bars_daily (
+    symbol VARCHAR(10) NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    open DECIMAL(10,2),
+    high DECIMAL(10,2),
+    low DECIMAL(10,2),
+    close DECIMAL(10,2),
+    volume BIGINT,
+    tick_count INT,
+    PRIMARY KEY (symbol, bucket_start)
+);
+
+-- Seed ticks from existing price history; run 'python timeseries.py rollup --full' afterwards
+INSERT IGNORE INTO stock_ticks (symbol, ts, price, change_amount, change_percent, volume, market_cap, source)
+SELECT symbol, scraped_date, price, change_amount, change_percent, volume, market_cap, source
+FROM stock_prices;
+
+-- Create latest_quotes table (one row per symbol, maintained by the pipeline)
+CREATE TABLE IF NOT EXISTS latest_quotes (
+    symbol VARCHAR(10) PRIMARY KEY,
+    price DECIMAL(10,2),
+    change_amount DECIMAL(10,2),
+    change_percent DECIMAL(10,2),
+    abs_change_percent DECIMAL(10,2) AS (ABS(change_percent)) STORED,
+    volume BIGINT,
+    market_cap BIGINT,
+    source VARCHAR(100),
+    scraped_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_latest_quotes_trending (abs_change_percent)
+);
+
+-- Populate latest_quotes from existing price history
+INSERT INTO latest_quotes (symbol, price, change_amount, change_percent, volume, market_cap, source, scraped_date)
+SELECT sp.symbol, sp.price, sp.change_amount, sp.change_percent, sp.volume, sp.market_cap, sp.source, sp.scraped_date
+FROM stock_prices sp
+JOIN (SELECT symbol, MAX(scraped_date) AS max_date FROM stock_prices GROUP BY symbol) latest
+  ON sp.symbol = latest.symbol AND sp.scraped_date = latest.max_date
+ON DUPLICATE KEY UPDATE price = VALUES(price), change_amount = VALUES(change_amount),
+    change_percent = VALUES(change_percent), volume = VALUES(volume),
+    market_cap = VALUES(market_cap), source = VALUES(source), scraped_date = VALUES(scraped_date);
+
 -- Create user preferences table
 CREATE TABLE IF NOT EXISTS user_preferences (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -67,8 +191,29 @@ CREATE TABLE IF NOT EXISTS user_preferences (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- Change counters bumped by the scraping pipeline, used by the web app to invalidate caches
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create indices for common query patterns
 CREATE INDEX idx_fin_news_date ON financial_news(scraped_date);
 CREATE INDEX idx_fin_news_source ON financial_news(source);
 CREATE INDEX idx_stock_prices_symbol ON stock_prices(symbol);
-CREATE INDEX idx_stock_prices_date ON stock_prices(scraped_date);
\ No newline at end of file
+CREATE INDEX idx_stock_prices_date ON stock_prices(scraped_date);
+
+-- Full-text index used by search (SEARCH_BACKEND=mysql)
+CREATE FULLTEXT INDEX ft_fin_news ON financial_news(title, summary, content);
+-- Upgrading an existing database: add the per-day key used by the pipeline upserts
+-- ALTER TABLE stock_prices ADD COLUMN trade_date DATE;
+-- UPDATE stock_prices SET trade_date = DATE(scraped_date);
+-- DELETE older FROM stock_prices older JOIN stock_prices newer
+--     ON newer.symbol = older.symbol AND newer.trade_date = older.trade_date AND newer.scraped_date > older.scraped_date;
+-- ALTER TABLE stock_prices ADD UNIQUE KEY symbol_trade_date_unique (symbol, trade_date);
+-- ALTER TABLE stock_prices DROP INDEX symbol_date_unique;
+
+-- Upgrading an existing database: search pages seek on (scraped_date, id), so it may not be NULL
+-- UPDATE financial_news SET scraped_date = COALESCE(created_at, NOW()) WHERE scraped_date IS NULL;
+-- ALTER TABLE financial_news MODIFY scraped_date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP;
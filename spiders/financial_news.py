@@ -1,11 +1,24 @@
+import os
 import scrapy
-from datetime import datetime
+from datetime import datetime, timedelta
 from urllib.parse import urlparse, urljoin
 import re
+from scrapy import signals
+from twisted.internet import threads
+from sqlalchemy.exc import SQLAlchemyError
 from investor_info.items import FinancialNewsItem
+from investor_info.article_parser import extract_article
+from investor_info.crawl_state import CrawlState, stored_links
+from investor_info.database import get_engine
 from scrapy.linkextractors import LinkExtractor
 from scrapy.spiders import CrawlSpider, Rule
 
+# Publication date embedded in article URLs, e.g. cnbc.com/2024/03/15/... or reuters.com/...-2024-03-15/
+URL_DATE_PATTERNS = (
+    re.compile(r'/(\d{4})/(\d{2})/(\d{2})/'),
+    re.compile(r'-(\d{4})-(\d{2})-(\d{2})/?$'),
+)
+
 class FinancialNewsSpider(CrawlSpider):
     name = "financial_news"
     allowed_domains = ["finance.yahoo.com", "reuters.com", "cnbc.com"]
@@ -17,10 +30,15 @@ class FinancialNewsSpider(CrawlSpider):
         "https://www.cnbc.com/finance/"
     ]
     
+    # Listing pages link to articles several levels deep at most
+    custom_settings = {
+        'DEPTH_LIMIT': 3,
+    }
+    
     # Define rules for following links
     rules = (
-        # Follow pagination links
-        Rule(LinkExtractor(allow=r'page=\d+'), follow=True),
+        # Follow pagination links, revalidating them with conditional requests
+        Rule(LinkExtractor(allow=r'page=\d+'), follow=True, process_request='mark_conditional'),
         
         # Extract article links and follow them
         Rule(LinkExtractor(
@@ -30,10 +48,80 @@ class FinancialNewsSpider(CrawlSpider):
                 r'cnbc\.com/\d+/\d+/\d+/.*\.html'
             ]), 
             callback='parse_article', 
-            follow=True
+            follow=True,
+            process_request='skip_known_article'
         ),
     )
     
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        settings = crawler.settings
+        spider.crawl_state = CrawlState(
+            os.path.join(settings.get('CRAWL_STATE_DIR', '.crawl_state'), f"{spider.name}.json"),
+            seen_ttl_days=settings.getint('CRAWL_SEEN_TTL_DAYS', 90)
+        )
+        spider.max_age = timedelta(days=settings.getint('NEWS_MAX_AGE_DAYS', 7))
+        crawler.signals.connect(spider.load_crawl_state, signal=signals.spider_opened)
+        crawler.signals.connect(spider.save_crawl_state, signal=signals.spider_closed)
+        return spider
+    
+    def load_crawl_state(self, spider):
+        """Load the seen-URL set in a thread; the crawl starts once the returned Deferred fires
+
+        Streaming every stored link grows with the table, so it stays off the
+        reactor that other spiders and the scheduler share.
+        """
+        return threads.deferToThread(self._load_crawl_state)
+    
+    def _load_crawl_state(self):
+        """Read the state file and add every article already in the database"""
+        self.crawl_state.load()
+        try:
+            count = self.crawl_state.mark_all_seen(stored_links(get_engine()))
+            self.logger.info(f"Loaded crawl state: {len(self.crawl_state.seen)} seen URLs ({count} stored articles)")
+        except SQLAlchemyError as e:
+            self.logger.error(f"Could not load stored article links: {e}")
+    
+    def save_crawl_state(self, spider):
+        try:
+            self.crawl_state.save()
+        except OSError as e:
+            self.logger.error(f"Could not save crawl state: {e}")
+    
+    def start_requests(self):
+        for url in self.start_urls:
+            yield scrapy.Request(url, dont_filter=True, meta={'conditional': True})
+    
+    def mark_conditional(self, request, response):
+        request.meta['conditional'] = True
+        return request
+    
+    def url_date(self, url):
+        """Publication date embedded in an article URL, if any"""
+        for pattern in URL_DATE_PATTERNS:
+            match = pattern.search(urlparse(url).path)
+            if match:
+                try:
+                    return datetime(*map(int, match.groups()))
+                except ValueError:
+                    return None
+        return None
+    
+    def skip_known_article(self, request, response):
+        """Drop article requests that were crawled before or are older than the freshness cutoff"""
+        stats = self.crawler.stats
+        if self.crawl_state.is_seen(request.url):
+            stats.inc_value('crawl_state/skipped_seen', spider=self)
+            return None
+        
+        published = self.url_date(request.url)
+        if published and published < datetime.now() - self.max_age:
+            stats.inc_value('crawl_state/skipped_stale', spider=self)
+            return None
+        
+        return request
+    
     def determine_source(self, url):
         """Determine the source based on the URL domain"""
         domain = urlparse(url).netloc
@@ -45,103 +133,29 @@ class FinancialNewsSpider(CrawlSpider):
             return 'CNBC'
         return 'Unknown'
 
+    def article_stored(self, link, redirect_urls=()):
+        """Called by the pipeline once an article is saved; only saved articles are skipped next run"""
+        for url in [link, *redirect_urls]:
+            self.crawl_state.mark_seen(url)
+    
     def parse_article(self, response):
         """Parse article page for detailed content"""
         source = self.determine_source(response.url)
-        
-        # Different parsing logic based on source
-        if source == 'Yahoo Finance':
-            return self.parse_yahoo_article(response)
-        elif source == 'Reuters':
-            return self.parse_reuters_article(response)
-        elif source == 'CNBC':
-            return self.parse_cnbc_article(response)
-        else:
+        if source == 'Unknown':
             self.logger.warning(f"Unknown source for URL: {response.url}")
             return None
-
-    def parse_yahoo_article(self, response):
-        """Parse Yahoo Finance article"""
-        title = response.css('h1::text').get()
-        if not title:
-            return None
-            
-        # Extract article content
-        paragraphs = response.css('div.caas-body p::text').getall()
-        content = '\n\n'.join([p.strip() for p in paragraphs if p.strip()])
-        
-        # Extract summary
-        summary = response.css('div.caas-description::text').get()
-        
-        # Extract publish date
-        publish_date = response.css('time::text').get()
-        if not publish_date:
-            publish_date = response.css('time::attr(datetime)').get()
         
-        # Create item
-        item = FinancialNewsItem()
-        item['title'] = title.strip()
-        item['link'] = response.url
-        item['summary'] = summary.strip() if summary else ''
-        item['content'] = content
-        item['source'] = 'Yahoo Finance'
-        item['publish_date'] = publish_date
-        item['scraped_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        return item
-
-    def parse_reuters_article(self, response):
-        """Parse Reuters article"""
-        title = response.css('h1::text').get()
-        if not title:
+        # Embedded JSON-LD / __NEXT_DATA__ first, the source's selectors only when needed
+        fields, method = extract_article(response, source)
+        if not fields:
             return None
-            
-        # Extract article content
-        paragraphs = response.css('div.article-body__content__17Yit p::text').getall()
-        content = '\n\n'.join([p.strip() for p in paragraphs if p.strip()])
-        
-        # Extract summary
-        summary = response.css('div.article-body__content__17Yit p:first-child::text').get()
+        self.crawler.stats.inc_value(f'article_parser/{method}', spider=self)
         
-        # Extract publish date
-        publish_date = response.css('time::attr(datetime)').get()
-        
-        # Create item
-        item = FinancialNewsItem()
-        item['title'] = title.strip()
+        item = FinancialNewsItem(**fields)
         item['link'] = response.url
-        item['summary'] = summary.strip() if summary else ''
-        item['content'] = content
-        item['source'] = 'Reuters'
-        item['publish_date'] = publish_date
+        # Remembered as crawled too, once the pipeline stores the article
+        item['redirect_urls'] = response.meta.get('redirect_urls', [])
+        item['source'] = source
         item['scraped_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         return item
-
-    def parse_cnbc_article(self, response):
-        """Parse CNBC article"""
-        title = response.css('h1.ArticleHeader-headline::text').get()
-        if not title:
-            return None
-            
-        # Extract article content
-        paragraphs = response.css('div.ArticleBody-articleBody p::text').getall()
-        content = '\n\n'.join([p.strip() for p in paragraphs if p.strip()])
-        
-        # Extract summary
-        summary = response.css('div.ArticleHeader-summary::text').get()
-        
-        # Extract publish date
-        publish_date = response.css('time::attr(datetime)').get()
-        
-        # Create item
-        item = FinancialNewsItem()
-        item['title'] = title.strip()
-        item['link'] = response.url
-        item['summary'] = summary.strip() if summary else ''
-        item['content'] = content
-        item['source'] = 'CNBC'
-        item['publish_date'] = publish_date
-        item['scraped_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        return item
\ No newline at end of file
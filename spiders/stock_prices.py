@@ -3,7 +3,13 @@ from datetime import datetime
 import re
 import json
 import logging
+from urllib.parse import quote
 from investor_info.items import StockPriceItem
+from scrapy import signals
+from sqlalchemy.exc import SQLAlchemyError
+from twisted.internet import threads
+from investor_info.database import get_engine
+from investor_info.tracked_symbols import COMPANY_NAMES, load_tracked_companies
 
 class StockPriceSpider(scrapy.Spider):
     name = "stock_prices"
@@ -27,52 +33,155 @@ class StockPriceSpider(scrapy.Spider):
         }
     }
     
-    # List of stock symbols to track
-    stock_symbols = [
-        "AAPL", "MSFT", "AMZN", "GOOGL", "META", 
-        "TSLA", "NVDA", "JPM", "V", "PG",
-        "JNJ", "UNH", "HD", "BAC", "MA",
-        # Major indices
-        "^GSPC", "^DJI", "^IXIC", "^FTSE", "^N225"
-    ]
+    # Built-in stock symbols and major indices; watchlist symbols are added when the spider opens
+    stock_symbols = list(COMPANY_NAMES)
+    
+    # Symbols per batched v7 quote request; 0 requests every symbol separately
+    quote_batch_size = 10
+    
+    # Per-symbol endpoints, tried one after another until one returns a price
+    SYMBOL_ENDPOINTS = {
+        'summary': ("https://query1.finance.yahoo.com/v10/finance/quoteSummary/{symbol}?modules=price,summaryDetail,defaultKeyStatistics", 'parse_quote_summary'),
+        'quote': ("https://query1.finance.yahoo.com/v7/finance/quote?symbols={symbol}", 'parse_quote_api'),
+        'chart': ("https://query1.finance.yahoo.com/v8/finance/chart/{symbol}?interval=1d&range=1d", 'parse_chart_api'),
+    }
+    
+    # Fallback order when fetching symbol by symbol, and after a batch missed a symbol
+    SYMBOL_FALLBACKS = ['summary', 'quote', 'chart']
+    BATCH_FALLBACKS = ['summary', 'chart']
+    
+    def __init__(self, *args, batch_size=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if batch_size is not None:
+            self.quote_batch_size = int(batch_size)
+    
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.load_symbols, signal=signals.spider_opened)
+        return spider
+    
+    def load_symbols(self, spider):
+        """Add symbols from user watchlists and stored quotes; read in a thread, off the reactor"""
+        return threads.deferToThread(self._load_symbols)
+    
+    def _load_symbols(self):
+        try:
+            self.stock_symbols = list(load_tracked_companies(get_engine()))
+            self.logger.info(f"Tracking {len(self.stock_symbols)} symbols")
+        except SQLAlchemyError as e:
+            self.logger.error(f"Could not load watchlist symbols, using the built-in list: {e}")
     
     def start_requests(self):
-        """Generate request for each stock symbol"""
-        for symbol in self.stock_symbols:
-            # Primary method: Quote Summary API - best for market cap and detailed data
-            summary_url = f"https://query1.finance.yahoo.com/v10/finance/quoteSummary/{symbol}?modules=price,summaryDetail,defaultKeyStatistics"
-            yield scrapy.Request(
-                url=summary_url,
-                callback=self.parse_quote_summary,
-                meta={'symbol': symbol},
-                errback=self.handle_error,
-                priority=3  # Highest priority
-            )
-            
-            # Backup method: Quote API 
-            api_url = f"https://query1.finance.yahoo.com/v7/finance/quote?symbols={symbol}"
-            yield scrapy.Request(
-                url=api_url,
-                callback=self.parse_quote_api,
-                meta={'symbol': symbol},
-                errback=self.handle_error,
-                priority=2  # High priority
-            )
-            
-            # Third option: Chart API as backup
-            chart_api_url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}?interval=1d&range=1d"
-            yield scrapy.Request(
-                url=chart_api_url,
-                callback=self.parse_chart_api,
-                meta={'symbol': symbol},
-                errback=self.handle_error,
-                priority=1  # Medium priority
-            )
+        """Request quotes in batches, or symbol by symbol when batching is disabled"""
+        if self.quote_batch_size > 0:
+            for i in range(0, len(self.stock_symbols), self.quote_batch_size):
+                yield self.batch_request(self.stock_symbols[i:i + self.quote_batch_size])
+        else:
+            for symbol in self.stock_symbols:
+                yield self.fallback_request(symbol, self.SYMBOL_FALLBACKS)
+    
+    def batch_request(self, symbols):
+        """Build one v7 quote request covering several symbols"""
+        batch_url = f"https://query1.finance.yahoo.com/v7/finance/quote?symbols={quote(','.join(symbols), safe=',')}"
+        return scrapy.Request(
+            url=batch_url,
+            callback=self.parse_quote_batch,
+            meta={'symbols': symbols},
+            errback=self.handle_batch_error,
+            dont_filter=True,
+            priority=3
+        )
+    
+    def fallback_request(self, symbol, endpoints):
+        """Build a request for the first of the given per-symbol endpoints"""
+        if not endpoints:
+            self.logger.warning(f"No price data found for {symbol} from any endpoint")
+            return None
+        
+        url_template, callback = self.SYMBOL_ENDPOINTS[endpoints[0]]
+        return scrapy.Request(
+            url=url_template.format(symbol=symbol),
+            callback=getattr(self, callback),
+            meta={'symbol': symbol, 'fallbacks': endpoints[1:]},
+            errback=self.handle_error,
+            dont_filter=True,
+            priority=2
+        )
+    
+    def next_fallback(self, meta):
+        """Request the next endpoint for a symbol whose current endpoint gave no price"""
+        return self.fallback_request(meta['symbol'], meta.get('fallbacks', []))
     
     def handle_error(self, failure):
         """Handle request errors"""
         symbol = failure.request.meta.get('symbol', 'Unknown')
         self.logger.error(f"Error scraping {symbol}: {repr(failure)}")
+        
+        request = self.next_fallback(failure.request.meta)
+        if request:
+            yield request
+    
+    def handle_batch_error(self, failure):
+        """Fall back to per-symbol requests when a batch request fails"""
+        symbols = failure.request.meta.get('symbols', [])
+        self.logger.error(f"Error scraping batch {','.join(symbols)}: {repr(failure)}")
+        
+        for symbol in symbols:
+            yield self.fallback_request(symbol, self.BATCH_FALLBACKS)
+    
+    def build_item(self, symbol, price, change_amount, change_percent, volume, market_cap):
+        """Create a StockPriceItem, or return None when there is no price"""
+        if not price:
+            return None
+        
+        item = StockPriceItem()
+        item['symbol'] = symbol
+        item['price'] = float(price)
+        item['change_amount'] = float(change_amount) if change_amount is not None else 0.0
+        item['change_percent'] = float(change_percent) if change_percent is not None else 0.0
+        item['volume'] = int(volume) if volume else 0
+        item['market_cap'] = int(market_cap) if market_cap else 0
+        item['source'] = 'Yahoo Finance API'
+        item['scraped_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return item
+    
+    def parse_quote_batch(self, response):
+        """Parse a batched v7 quote response and fall back for symbols it is missing"""
+        symbols = response.meta['symbols']
+        self.logger.info(f"Processing batched Quote API data for {len(symbols)} symbols")
+        
+        results = []
+        try:
+            data = json.loads(response.text)
+            results = (data.get('quoteResponse') or {}).get('result') or []
+        except json.JSONDecodeError:
+            self.logger.error(f"Invalid JSON from batched Quote API for {','.join(symbols)}")
+        
+        found = set()
+        for quote_data in results:
+            symbol = quote_data.get('symbol')
+            if symbol not in symbols or symbol in found:
+                continue
+            
+            item = self.build_item(
+                symbol,
+                quote_data.get('regularMarketPrice'),
+                quote_data.get('regularMarketChange'),
+                quote_data.get('regularMarketChangePercent'),
+                quote_data.get('regularMarketVolume'),
+                quote_data.get('marketCap')
+            )
+            if item:
+                found.add(symbol)
+                yield item
+        
+        # Only symbols the batch did not cover get per-symbol requests
+        missing = [symbol for symbol in symbols if symbol not in found]
+        if missing:
+            self.logger.warning(f"Batched Quote API missing data for: {', '.join(missing)}")
+        for symbol in missing:
+            yield self.fallback_request(symbol, self.BATCH_FALLBACKS)
     
     def parse_quote_summary(self, response):
         """Parse stock data from Yahoo Finance Quote Summary API - this has the most complete data"""
@@ -120,18 +229,7 @@ class StockPriceSpider(scrapy.Spider):
                 
                 # Only proceed if we have at least a price
                 if price:
-                    # Create item
-                    item = StockPriceItem()
-                    item['symbol'] = symbol
-                    item['price'] = float(price)
-                    item['change_amount'] = float(change_amount) if change_amount is not None else 0.0
-                    item['change_percent'] = float(change_percent) if change_percent is not None else 0.0
-                    item['volume'] = int(volume) if volume else 0
-                    item['market_cap'] = int(market_cap) if market_cap else 0
-                    item['source'] = 'Yahoo Finance API'
-                    item['scraped_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    
-                    return item
+                    return self.build_item(symbol, price, change_amount, change_percent, volume, market_cap)
                 else:
                     self.logger.warning(f"Quote Summary API missing price data for {symbol}")
             else:
@@ -141,6 +239,9 @@ class StockPriceSpider(scrapy.Spider):
             self.logger.error(f"Invalid JSON from Quote Summary API for {symbol}")
         except Exception as e:
             self.logger.error(f"Error processing Quote Summary API data for {symbol}: {str(e)}")
+        
+        # No usable price from this endpoint, try the next one for the symbol
+        return self.next_fallback(response.meta)
     
     def safe_extract(self, data, key, sub_key=None):
         """Safely extract nested values from API response"""
@@ -179,18 +280,7 @@ class StockPriceSpider(scrapy.Spider):
                 
                 # Only proceed if we have at least a price
                 if price:
-                    # Create item
-                    item = StockPriceItem()
-                    item['symbol'] = symbol
-                    item['price'] = float(price)
-                    item['change_amount'] = float(change_amount) if change_amount is not None else 0.0
-                    item['change_percent'] = float(change_percent) if change_percent is not None else 0.0
-                    item['volume'] = int(volume) if volume else 0
-                    item['market_cap'] = int(market_cap) if market_cap else 0
-                    item['source'] = 'Yahoo Finance API'
-                    item['scraped_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    
-                    return item
+                    return self.build_item(symbol, price, change_amount, change_percent, volume, market_cap)
                 else:
                     self.logger.warning(f"Quote API missing price data for {symbol}")
             else:
@@ -200,6 +290,9 @@ class StockPriceSpider(scrapy.Spider):
             self.logger.error(f"Invalid JSON from Quote API for {symbol}")
         except Exception as e:
             self.logger.error(f"Error processing Quote API data for {symbol}: {str(e)}")
+        
+        # No usable price from this endpoint, try the next one for the symbol
+        return self.next_fallback(response.meta)
     
     def parse_chart_api(self, response):
         """Parse stock data from Yahoo Finance Chart API"""
@@ -241,18 +334,7 @@ class StockPriceSpider(scrapy.Spider):
                 
                 # Only proceed if we have at least a price
                 if price:
-                    # Create item
-                    item = StockPriceItem()
-                    item['symbol'] = symbol
-                    item['price'] = float(price)
-                    item['change_amount'] = float(change_amount) if change_amount is not None else 0.0
-                    item['change_percent'] = float(change_percent) if change_percent is not None else 0.0
-                    item['volume'] = int(volume) if volume else 0
-                    item['market_cap'] = int(market_cap) if market_cap else 0
-                    item['source'] = 'Yahoo Finance API'
-                    item['scraped_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    
-                    return item
+                    return self.build_item(symbol, price, change_amount, change_percent, volume, market_cap)
                 else:
                     self.logger.warning(f"Chart API missing price data for {symbol}")
             else:
@@ -262,6 +344,9 @@ class StockPriceSpider(scrapy.Spider):
             self.logger.error(f"Invalid JSON from Chart API for {symbol}")
         except Exception as e:
             self.logger.error(f"Error processing Chart API data for {symbol}: {str(e)}")
+        
+        # No usable price from this endpoint, try the next one for the symbol
+        return self.next_fallback(response.meta)
     
     def safe_float(self, value):
         """Convert string to float safely"""
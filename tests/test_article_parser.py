@@ -0,0 +1,110 @@
+import os
+import json
+import pytest
+from scrapy.http import HtmlResponse
+from investor_info.article_parser import embedded_article, extract_article
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'fixtures')
+TITLE = 'Apple shares rise after earnings beat as services revenue hits record'
+
+# Fixture name -> (article URL, source)
+FIXTURE_SOURCES = {
+    'yahoo_jsonld.html': ('https://finance.yahoo.com/news/apple-shares-rise-200000000.html', 'Yahoo Finance'),
+    'reuters_next_data.html': ('https://www.reuters.com/business/finance/apple-shares-rise-2024-05-02/', 'Reuters'),
+    'cnbc_jsonld.html': ('https://www.cnbc.com/2024/05/02/apple-shares-rise.html', 'CNBC'),
+    'yahoo_selectors.html': ('https://finance.yahoo.com/news/apple-shares-rise-200000000.html', 'Yahoo Finance'),
+}
+
+
+def fixture_response(name):
+    url, source = FIXTURE_SOURCES[name]
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return HtmlResponse(url, body=f.read(), encoding='utf-8'), source
+
+
+def yahoo_page(json_ld=None, body_paragraphs=('First paragraph.', 'Second paragraph.')):
+    script = f'<script type="application/ld+json">{json_ld}</script>' if json_ld is not None else ''
+    paragraphs = ''.join(f'<p>{text}</p>' for text in body_paragraphs)
+    html = (
+        f'<html><head>{script}</head><body><h1>Selector title</h1>'
+        f'<div class="caas-description">Selector summary</div>'
+        f'<time datetime="2024-05-02T20:31:00Z">May 2, 2024</time>'
+        f'<div class="caas-body">{paragraphs}</div></body></html>'
+    )
+    return HtmlResponse('https://finance.yahoo.com/news/test.html', body=html.encode(), encoding='utf-8')
+
+
+@pytest.mark.parametrize('name', ['yahoo_jsonld.html', 'reuters_next_data.html', 'cnbc_jsonld.html'])
+def test_embedded_json_is_used_when_complete(name):
+    response, source = fixture_response(name)
+    fields, method = extract_article(response, source)
+
+    assert method == 'embedded'
+    assert fields['title'] == TITLE
+    assert fields['content']
+    assert fields['publish_date']
+
+
+@pytest.mark.parametrize('name', ['yahoo_jsonld.html', 'reuters_next_data.html', 'cnbc_jsonld.html'])
+def test_embedded_json_matches_the_selectors(name):
+    response, source = fixture_response(name)
+    fast, _ = extract_article(response, source)
+    slow, method = extract_article(response, source, use_embedded=False)
+
+    assert method == 'selectors'
+    assert (fast['title'], fast['content']) == (slow['title'], slow['content'])
+
+
+def test_pages_without_embedded_json_fall_back_to_selectors():
+    response, source = fixture_response('yahoo_selectors.html')
+    assert embedded_article(response.text) == {}
+
+    fields, method = extract_article(response, source)
+    assert method == 'selectors'
+    assert fields['title'] == TITLE
+    assert fields['content']
+
+
+def test_selectors_fill_only_the_fields_missing_from_embedded_json():
+    json_ld = json.dumps({
+        '@type': 'NewsArticle', 'headline': 'Embedded title', 'datePublished': '2024-05-01T08:00:00Z'
+    })
+    fields, method = extract_article(yahoo_page(json_ld), 'Yahoo Finance')
+
+    assert method == 'selectors'
+    assert fields['title'] == 'Embedded title'
+    assert fields['publish_date'] == '2024-05-01T08:00:00Z'
+    assert fields['content'] == 'First paragraph.\n\nSecond paragraph.'
+    assert fields['summary'] == 'Selector summary'
+
+
+def test_selectors_supply_a_missing_embedded_title():
+    json_ld = json.dumps({'@type': 'NewsArticle', 'articleBody': 'Embedded body.'})
+    fields, method = extract_article(yahoo_page(json_ld), 'Yahoo Finance')
+
+    assert method == 'selectors'
+    assert fields['title'] == 'Selector title'
+    assert fields['content'] == 'Embedded body.'
+
+
+def test_malformed_json_ld_is_skipped():
+    page = yahoo_page('{"@type": "NewsArticle", "headline": ')
+    assert embedded_article(page.text) == {}
+
+    fields, method = extract_article(page, 'Yahoo Finance')
+    assert method == 'selectors'
+    assert fields['title'] == 'Selector title'
+
+
+def test_a_later_valid_script_is_used_after_a_malformed_one():
+    valid = json.dumps({'@type': 'NewsArticle', 'headline': 'Valid', 'articleBody': 'Body.'})
+    html = (
+        '<script type="application/ld+json">{not json</script>'
+        f'<script type="application/ld+json">{valid}</script>'
+    )
+    assert embedded_article(html) == {'title': 'Valid', 'content': 'Body.'}
+
+
+def test_pages_without_a_title_are_rejected():
+    page = HtmlResponse('https://example.com/a.html', body=b'<html><body><p>Text</p></body></html>', encoding='utf-8')
+    assert extract_article(page, 'Unknown source') == (None, None)
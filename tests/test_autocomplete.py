@@ -0,0 +1,100 @@
+import pytest
+from app import app, db
+from models import FinancialNews
+from autocomplete import AutocompleteIndex, PrefixIndex, TRACKED_WEIGHT
+
+
+class FakeVersions:
+    def __init__(self):
+        self.version = 1
+
+    def current(self, name):
+        return self.version
+
+
+def add_headlines(titles, start=0):
+    db.session.add_all([
+        FinancialNews(title=title, link=f"https://example.com/{start + number}")
+        for number, title in enumerate(titles)
+    ])
+    db.session.commit()
+
+
+@pytest.fixture
+def context():
+    with app.app_context():
+        db.create_all()
+        yield
+        db.session.remove()
+        db.drop_all()
+
+
+def test_tracked_names_rank_above_headline_words():
+    index = PrefixIndex()
+    index.update([('apparel', 50), ('Apple', TRACKED_WEIGHT), ('applications', 3), ('AAPL', TRACKED_WEIGHT)])
+
+    assert index.search('app') == ['Apple', 'apparel', 'applications']
+    assert index.search('a', limit=2) == ['AAPL', 'Apple']
+
+
+def test_updates_add_weights_and_keep_keys_sorted():
+    index = PrefixIndex()
+    index.update([('banks', 2), ('bonds', 5)])
+    index.update([('banks', 4), ('bank', 1), ('zinc', 1), ('alpha', 1)])
+
+    keys, labels, scores = index.entries
+    assert list(keys) == sorted(keys)
+    assert len(index) == 5
+    assert index.search('ban') == ['banks', 'bank']
+    assert scores[keys.index('banks')] == 6
+
+
+def test_a_tracked_label_replaces_a_headline_word():
+    index = PrefixIndex()
+    index.update([('nvidia', 10)])
+    index.update([('NVIDIA', TRACKED_WEIGHT)])
+    index.update([('nvidia', 10)])
+
+    assert index.search('nvid') == ['NVIDIA']
+    assert index.entries[2] == (TRACKED_WEIGHT + 10,)
+
+
+def test_multi_word_queries_complete_the_last_word(context):
+    add_headlines(['Treasury yields climb', 'Bond yields slip', 'Yield curve inverts'])
+    index = AutocompleteIndex(FakeVersions())
+
+    suggestions = index.suggest('bond yie')
+    assert suggestions[0] == 'bond yields'
+    assert 'bond yield' in suggestions
+
+
+def test_refresh_adds_new_headlines_incrementally(context):
+    add_headlines(['Copper rally'])
+    versions = FakeVersions()
+    index = AutocompleteIndex(versions, headline_window=10)
+    assert 'cobalt' not in index.suggest('co')
+
+    add_headlines(['Cobalt shortage'], start=1)
+    rebuilt = index.index
+    versions.version += 1
+
+    assert 'cobalt' in index.suggest('co')
+    assert index.index is rebuilt
+    assert index.added == 2
+
+
+def test_refresh_rebuilds_once_additions_outgrow_the_window(context):
+    versions = FakeVersions()
+    index = AutocompleteIndex(versions, headline_window=2)
+    index.suggest('a')
+
+    add_headlines([f"Headline number{count}" for count in range(5)])
+    versions.version += 1
+    index.suggest('a')
+    assert index.added == 5
+
+    previous = index.index
+    versions.version += 1
+    index.suggest('a')
+    assert index.index is not previous
+    assert index.added == 2
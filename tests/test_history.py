@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+import pytest
+from app import app, db
+from models import StockTick
+
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.create_all()
+        now = datetime.now().replace(second=0, microsecond=0)
+        db.session.add_all([
+            StockTick(symbol='AAPL', ts=now - timedelta(minutes=minute), price=100.0 + minute, volume=10)
+            for minute in range(1, 120)
+        ])
+        db.session.commit()
+    yield app.test_client()
+    with app.app_context():
+        db.drop_all()
+
+
+def test_hours_range_serves_minute_bars(client):
+    response = client.get('/api/stock/AAPL/history?hours=2&interval=minute')
+    points = response.get_json()
+
+    assert response.headers['X-History-Interval'] == 'minute'
+    assert 100 <= len(points) <= 121
+    assert points[-1]['close'] == 101.0
+
+
+def test_day_range_falls_back_to_hourly_bars(client):
+    response = client.get('/api/stock/AAPL/history?days=1&interval=minute')
+    assert response.headers['X-History-Interval'] == 'hour'
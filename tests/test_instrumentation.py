@@ -0,0 +1,52 @@
+import os
+import sys
+import subprocess
+from instrumentation import RouteMetrics
+
+WEB_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'web_app')
+
+WORKER = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from instrumentation import RouteMetrics
+metrics = RouteMetrics()
+metrics.observe('/news', 0.02, 3, 0.01)
+metrics.record_slow_query()
+"""
+
+SCRAPE = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from instrumentation import RouteMetrics
+sys.stdout.write(RouteMetrics().render().decode())
+"""
+
+
+def run(script, metrics_dir):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(metrics_dir))
+    return subprocess.run([sys.executable, '-c', script, WEB_APP], env=env,
+                          capture_output=True, text=True, check=True).stdout
+
+
+def test_render_exposes_histograms_and_counters(monkeypatch):
+    monkeypatch.delenv('PROMETHEUS_MULTIPROC_DIR', raising=False)
+    metrics = RouteMetrics()
+    metrics.observe('/news/<int:news_id>', 0.03, 4, 0.012)
+    metrics.observe('/news/<int:news_id>', 0.7, 2, 0.5)
+    metrics.record_slow_query()
+
+    text = metrics.render().decode()
+    assert 'http_request_duration_seconds_bucket{le="0.05",route="/news/<int:news_id>"} 1.0' in text
+    assert 'http_request_duration_seconds_bucket{le="+Inf",route="/news/<int:news_id>"} 2.0' in text
+    assert 'http_request_queries_total{route="/news/<int:news_id>"} 6.0' in text
+    assert 'db_slow_queries_total 1.0' in text
+
+
+def test_any_worker_reports_the_totals_of_all_workers(tmp_path):
+    run(WORKER, tmp_path)
+    run(WORKER, tmp_path)
+
+    text = run(SCRAPE, tmp_path)
+    assert 'http_request_duration_seconds_count{route="/news"} 2.0' in text
+    assert 'http_request_queries_total{route="/news"} 6.0' in text
+    assert 'db_slow_queries_total 2.0' in text
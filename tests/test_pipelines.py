@@ -0,0 +1,96 @@
+import scrapy
+from scrapy.utils.test import get_crawler
+from investor_info.dedup import NearDuplicateIndex
+from investor_info.items import FinancialNewsItem
+from investor_info.pipelines import DatabasePipeline
+
+CONTENT = ' '.join(f"word{number}" for number in range(60))
+
+
+def news_item(link):
+    return FinancialNewsItem(title='Markets rally', link=link, summary='', content=CONTENT,
+                             source='Reuters', sentiment=0.0, scraped_date='2024-05-02 10:00:00')
+
+
+def make_pipeline(engine):
+    pipeline = DatabasePipeline(buffered=False, related=False, sentiment=False)
+    pipeline.engine = engine
+    pipeline.news_index = NearDuplicateIndex()
+    return pipeline
+
+
+def make_spider():
+    return scrapy.Spider.from_crawler(get_crawler(scrapy.Spider), name='news')
+
+
+def test_failed_batch_is_removed_from_dedup_index(engine):
+    pipeline, spider = make_pipeline(engine), make_spider()
+
+    engine.fail = True
+    pipeline.process_item(news_item('https://example.com/a'), spider)
+    assert len(pipeline.news_index) == 0
+
+    # The syndicated copy is stored as an article, not linked to the lost one
+    engine.fail = False
+    pipeline.process_item(news_item('https://example.com/b'), spider)
+    assert not pipeline.duplicate_buffer
+    assert any(sql.startswith('INSERT INTO financial_news') for sql in engine.statements)
+    assert not any('news_duplicates' in sql for sql in engine.statements)
+    assert len(pipeline.news_index) == 1
+
+
+def test_copy_of_stored_article_is_a_duplicate(engine):
+    pipeline, spider = make_pipeline(engine), make_spider()
+
+    pipeline.process_item(news_item('https://example.com/a'), spider)
+    pipeline.process_item(news_item('https://example.com/b'), spider)
+    assert any('news_duplicates' in sql for sql in engine.statements)
+
+
+def test_duplicates_of_a_failed_batch_do_not_fail_the_next_one(engine):
+    pipeline, spider = make_pipeline(engine), make_spider()
+    pipeline.buffered, pipeline.batch_size = True, 10
+
+    # A copy of the first article is already waiting, as if queued behind its write
+    engine.fail = True
+    pipeline.process_item(news_item('https://example.com/a'), spider)
+    pipeline.process_item(news_item('https://example.com/b'), spider)
+    pipeline.flush(spider)
+    assert spider.crawler.stats.get_value('pipeline/failed_items') == 2
+
+    engine.fail = False
+    pipeline.duplicate_buffer.append(('https://example.com/c', 'https://example.com/a', 'Markets rally', 'Reuters', 0.9, None))
+    other = news_item('https://example.com/d')
+    other['content'] = ' '.join(f"other{number}" for number in range(60))
+    pipeline.process_item(other, spider)
+    pipeline.flush(spider)
+
+    assert 'https://example.com/d' in engine.links
+    assert not any('news_duplicates' in sql for sql in engine.statements)
+    assert spider.crawler.stats.get_value('pipeline/failed_items') == 3
+
+
+def test_unexpected_write_error_is_reported_as_failed_items(engine, monkeypatch):
+    pipeline, spider = make_pipeline(engine), make_spider()
+
+    def broken_begin():
+        raise RuntimeError('driver crashed')
+    monkeypatch.setattr(engine, 'begin', broken_begin)
+
+    pipeline.process_item(news_item('https://example.com/a'), spider)
+    assert spider.crawler.stats.get_value('pipeline/failed_items') == 1
+    assert len(pipeline.news_index) == 0
+
+
+def test_related_article_errors_do_not_fail_a_committed_batch(engine, monkeypatch):
+    pipeline, spider = make_pipeline(engine), make_spider()
+    pipeline.related = True
+
+    def broken_update(engine, links):
+        raise ValueError('bad token counts')
+    monkeypatch.setattr(pipeline.related_index, 'update', broken_update)
+
+    pipeline.process_item(news_item('https://example.com/a'), spider)
+    assert 'https://example.com/a' in engine.links
+    assert not spider.crawler.stats.get_value('pipeline/failed_items')
+    assert len(pipeline.news_index) == 1
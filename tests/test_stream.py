@@ -0,0 +1,112 @@
+import pytest
+from stream import QuoteBroadcaster, quote_events
+
+
+class FakeQuoteCache:
+    def __init__(self, quotes):
+        self.version = 1
+        self.quotes = quotes
+        self.fail = False
+
+    def current_version(self):
+        return self.version
+
+    def get_many(self, symbols):
+        if self.fail:
+            raise RuntimeError('database unavailable')
+        return [dict(self.quotes[symbol]) for symbol in symbols if symbol in self.quotes]
+
+    def set_price(self, symbol, price):
+        self.quotes[symbol] = {'symbol': symbol, 'price': price}
+        self.version += 1
+
+
+@pytest.fixture
+def quote_cache():
+    return FakeQuoteCache({symbol: {'symbol': symbol, 'price': 100.0} for symbol in ('AAPL', 'MSFT', 'NVDA')})
+
+
+@pytest.fixture
+def broadcaster(quote_cache):
+    # A long poll interval keeps the background thread asleep; tests call broadcast() themselves
+    return QuoteBroadcaster(None, quote_cache, poll_interval=3600, max_subscribers=2)
+
+
+def test_subscribe_returns_a_snapshot(broadcaster):
+    subscription, snapshot = broadcaster.subscribe(['AAPL', 'MSFT'])
+
+    assert subscription.symbols == {'AAPL', 'MSFT'}
+    assert sorted(quote['symbol'] for quote in snapshot) == ['AAPL', 'MSFT']
+
+
+def test_subscribers_past_the_limit_are_refused(broadcaster):
+    broadcaster.subscribe(['AAPL'])
+    broadcaster.subscribe(['MSFT'])
+
+    assert broadcaster.subscribe(['NVDA']) == (None, None)
+    assert broadcaster.subscriber_count() == 2
+
+
+def test_a_failed_snapshot_releases_the_slot(broadcaster, quote_cache):
+    quote_cache.fail = True
+    with pytest.raises(RuntimeError):
+        broadcaster.subscribe(['AAPL'])
+
+    assert broadcaster.subscriber_count() == 0
+
+
+def test_clients_get_only_changed_quotes_for_their_symbols(broadcaster, quote_cache):
+    apple, _ = broadcaster.subscribe(['AAPL', 'MSFT'])
+    nvidia, _ = broadcaster.subscribe(['NVDA'])
+
+    # The first pass only records the baseline
+    broadcaster.broadcast()
+    assert apple.get(timeout=0) is None
+
+    quote_cache.set_price('AAPL', 101.0)
+    broadcaster.broadcast()
+    assert apple.get(timeout=0) == [{'symbol': 'AAPL', 'price': 101.0}]
+    assert nvidia.get(timeout=0) is None
+
+
+def test_nothing_is_sent_while_the_version_is_unchanged(broadcaster, quote_cache):
+    subscription, _ = broadcaster.subscribe(['AAPL'])
+    broadcaster.broadcast()
+
+    quote_cache.quotes['AAPL'] = {'symbol': 'AAPL', 'price': 105.0}
+    broadcaster.broadcast()
+    assert subscription.get(timeout=0) is None
+
+    quote_cache.version += 1
+    broadcaster.broadcast()
+    assert subscription.get(timeout=0) == [{'symbol': 'AAPL', 'price': 105.0}]
+
+
+def test_a_stalled_client_drops_updates_instead_of_blocking(broadcaster, quote_cache):
+    subscription, _ = broadcaster.subscribe(['AAPL'])
+    broadcaster.broadcast()
+    for price in range(subscription.queue.maxsize + 5):
+        quote_cache.set_price('AAPL', float(price))
+        broadcaster.broadcast()
+
+    assert subscription.queue.qsize() == subscription.queue.maxsize
+
+
+def test_closing_the_stream_unsubscribes(broadcaster):
+    subscription, snapshot = broadcaster.subscribe(['AAPL'])
+    events = quote_events(broadcaster, subscription, snapshot, keepalive=0)
+
+    assert next(events) == "retry: 3000\n\n"
+    assert next(events).startswith('event: quotes\n')
+    assert next(events) == ": keepalive\n\n"
+    events.close()
+
+    assert broadcaster.subscriber_count() == 0
+
+
+def test_streams_end_after_max_duration(broadcaster):
+    subscription, snapshot = broadcaster.subscribe(['AAPL'])
+    events = list(quote_events(broadcaster, subscription, snapshot, max_duration=0))
+
+    assert len(events) == 2
+    assert broadcaster.subscriber_count() == 0
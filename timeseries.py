@@ -0,0 +1,242 @@
+"""Intraday tick rollups and retention for stock price history
+
+Every quote the pipeline writes is appended to stock_ticks. The rollup job
+aggregates ticks into stock_bars_hourly and hourly bars into
+stock_bars_daily, and the retention job prunes raw ticks (and old hourly
+bars) once they are covered by the coarser tables.
+
+Run manually with:  python timeseries.py rollup [--full] | prune
+"""
+import os
+import sys
+import argparse
+import logging
+from datetime import datetime, timedelta
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bucket sizes in seconds, finest first
+INTERVALS = {
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+    'week': 604800,
+}
+
+# The Unix epoch is a Thursday; shift weekly buckets so they start on Monday
+WEEK_OFFSET = 3 * 86400
+
+BAR_COLUMNS = ('symbol', 'bucket_start', 'open', 'high', 'low', 'close', 'volume', 'tick_count')
+
+# (source table, target table, interval) in the order they must run
+ROLLUPS = (
+    ('stock_ticks', 'stock_bars_hourly', 'hour'),
+    ('stock_bars_hourly', 'stock_bars_daily', 'day'),
+)
+
+TICK_RETENTION_DAYS = int(os.environ.get('TICK_RETENTION_DAYS', 30))
+HOURLY_RETENTION_DAYS = int(os.environ.get('HOURLY_RETENTION_DAYS', 730))
+
+WRITE_CHUNK_SIZE = 500
+DELETE_CHUNK_SIZE = 10000
+
+
+def to_epoch(dates):
+    """Convert a sequence of naive datetimes to int64 epoch seconds"""
+    return np.array(dates, dtype='datetime64[s]').astype(np.int64)
+
+
+def to_datetimes(epochs):
+    """Convert int64 epoch seconds back to naive datetimes"""
+    return np.asarray(epochs).astype('datetime64[s]').tolist()
+
+
+def aggregate_bars(timestamps, opens, highs, lows, closes, volumes, interval, counts=None, groups=None):
+    """Aggregate time-sorted ticks or bars into coarser OHLC buckets
+
+    Raw ticks are passed with their price as open, high, low and close.
+    Rows must be sorted by (group, timestamp); groups is an optional array
+    of per-row integer keys (e.g. symbol codes) so several symbols can be
+    aggregated in one pass. Yahoo reports the day's cumulative volume with
+    every quote, so a bucket's volume is the last value seen in it.
+    """
+    bucket_seconds = INTERVALS[interval]
+    offset = WEEK_OFFSET if interval == 'week' else 0
+    if counts is None:
+        counts = np.ones(len(timestamps), dtype=np.int64)
+
+    if len(timestamps) == 0:
+        empty = np.array([], dtype=np.int64)
+        return {'group': empty, 'start': empty, 'open': np.array([]), 'high': np.array([]),
+                'low': np.array([]), 'close': np.array([]), 'volume': empty, 'count': empty}
+
+    buckets = (timestamps + offset) // bucket_seconds
+    boundary = buckets[1:] != buckets[:-1]
+    if groups is not None:
+        boundary |= groups[1:] != groups[:-1]
+
+    # Index of the first and last row of every bucket
+    starts = np.flatnonzero(np.r_[True, boundary])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+
+    return {
+        'group': groups[starts] if groups is not None else np.zeros(len(starts), dtype=np.int64),
+        'start': buckets[starts] * bucket_seconds - offset,
+        'open': opens[starts],
+        'high': np.maximum.reduceat(highs, starts),
+        'low': np.minimum.reduceat(lows, starts),
+        'close': closes[ends],
+        'volume': volumes[ends],
+        'count': np.add.reduceat(counts, starts),
+    }
+
+
+def bucket_floor(moment, interval):
+    """Return the start of the bucket containing moment"""
+    bucket_seconds = INTERVALS[interval]
+    epoch = int(to_epoch([moment])[0])
+    return to_datetimes([epoch - epoch % bucket_seconds])[0]
+
+
+def _read_source(conn, source, since):
+    """Read ticks or bars since a bucket boundary as arrays sorted by (symbol, time)"""
+    if source == 'stock_ticks':
+        sql = (
+            "SELECT symbol, ts, price, price, price, price, volume, 1 FROM stock_ticks "
+            "WHERE price IS NOT NULL"
+        )
+        time_column = 'ts'
+    else:
+        sql = f"SELECT symbol, bucket_start, open, high, low, close, volume, tick_count FROM {source} WHERE 1 = 1"
+        time_column = 'bucket_start'
+
+    params = ()
+    if since is not None:
+        sql += f" AND {time_column} >= %s"
+        params = (since,)
+    sql += f" ORDER BY symbol, {time_column}"
+
+    rows = conn.exec_driver_sql(sql, params).fetchall()
+    if not rows:
+        return None
+
+    symbols, times, opens, highs, lows, closes, volumes, counts = zip(*rows)
+    symbol_names, groups = np.unique(np.array(symbols, dtype=object), return_inverse=True)
+    return symbol_names, {
+        'groups': groups.astype(np.int64),
+        'timestamps': to_epoch(times),
+        'opens': np.array(opens, dtype=np.float64),
+        'highs': np.array(highs, dtype=np.float64),
+        'lows': np.array(lows, dtype=np.float64),
+        'closes': np.array(closes, dtype=np.float64),
+        'volumes': np.array([volume or 0 for volume in volumes], dtype=np.int64),
+        'counts': np.array(counts, dtype=np.int64),
+    }
+
+
+def _upsert_bars(conn, table, rows):
+    """Write bar rows with multi-row INSERT ... ON DUPLICATE KEY UPDATE"""
+    placeholders = '(' + ', '.join(['%s'] * len(BAR_COLUMNS)) + ')'
+    updates = ', '.join(f"{column} = VALUES({column})" for column in BAR_COLUMNS[2:])
+    for offset in range(0, len(rows), WRITE_CHUNK_SIZE):
+        chunk = rows[offset:offset + WRITE_CHUNK_SIZE]
+        sql = (
+            f"INSERT INTO {table} ({', '.join(BAR_COLUMNS)}) "
+            f"VALUES {', '.join([placeholders] * len(chunk))} "
+            f"ON DUPLICATE KEY UPDATE {updates}"
+        )
+        conn.exec_driver_sql(sql, tuple(value for row in chunk for value in row))
+
+
+def rollup(conn, source, target, interval, since=None):
+    """Rebuild the target buckets from the source table since a point in time
+
+    Buckets are recomputed in full, so running the job repeatedly over an
+    overlapping window is safe. Returns the number of bars written.
+    """
+    if since is not None:
+        since = bucket_floor(since, interval)
+
+    data = _read_source(conn, source, since)
+    if data is None:
+        return 0
+    symbol_names, arrays = data
+
+    bars = aggregate_bars(
+        arrays['timestamps'], arrays['opens'], arrays['highs'], arrays['lows'],
+        arrays['closes'], arrays['volumes'], interval,
+        counts=arrays['counts'], groups=arrays['groups']
+    )
+
+    rows = list(zip(
+        symbol_names[bars['group']].tolist(),
+        to_datetimes(bars['start']),
+        bars['open'].tolist(),
+        bars['high'].tolist(),
+        bars['low'].tolist(),
+        bars['close'].tolist(),
+        bars['volume'].tolist(),
+        bars['count'].tolist()
+    ))
+    _upsert_bars(conn, target, rows)
+    return len(rows)
+
+
+def _delete_before(conn, table, column, cutoff):
+    """Delete rows older than cutoff in chunks to keep transactions short"""
+    deleted = 0
+    while True:
+        result = conn.exec_driver_sql(
+            f"DELETE FROM {table} WHERE {column} < %s LIMIT {DELETE_CHUNK_SIZE}", (cutoff,)
+        )
+        conn.commit()
+        deleted += result.rowcount
+        if result.rowcount < DELETE_CHUNK_SIZE:
+            return deleted
+
+
+def apply_retention(engine, tick_days=TICK_RETENTION_DAYS, hourly_days=HOURLY_RETENTION_DAYS):
+    """Prune raw ticks and hourly bars that are older than their retention window"""
+    now = datetime.now()
+    with engine.connect() as conn:
+        ticks = _delete_before(conn, 'stock_ticks', 'ts', now - timedelta(days=tick_days))
+        hourly = _delete_before(conn, 'stock_bars_hourly', 'bucket_start', now - timedelta(days=hourly_days))
+    logger.info(f"Retention removed {ticks} ticks and {hourly} hourly bars")
+    return ticks, hourly
+
+
+def run_rollups(engine=None, full=False, lookback_hours=3):
+    """Roll ticks up into hourly and daily bars
+
+    By default only the last few hours are recomputed, which also finalises
+    buckets that were still open during the previous run. full=True rebuilds
+    every bucket from the available source rows.
+    """
+    if engine is None:
+        from database import get_engine
+        engine = get_engine()
+
+    since = None if full else datetime.now() - timedelta(hours=lookback_hours)
+    written = {}
+    with engine.begin() as conn:
+        for source, target, interval in ROLLUPS:
+            written[target] = rollup(conn, source, target, interval, since)
+    logger.info(f"Rollups written: {written}")
+    return written
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description='Stock tick rollups and retention')
+    parser.add_argument('command', choices=['rollup', 'prune'])
+    parser.add_argument('--full', action='store_true', help='rebuild all buckets instead of the recent window')
+    args = parser.parse_args()
+
+    if args.command == 'rollup':
+        run_rollups(full=args.full)
+    else:
+        from database import get_engine
+        apply_retention(get_engine())
@@ -0,0 +1,58 @@
+"""Symbols the stock spider quotes and the news pipeline tags
+
+COMPANY_NAMES is the built-in list. Symbols users add to their watchlists,
+and any symbol already in latest_quotes, are tracked as well: they are
+loaded from the database when a spider opens, so a new watchlist symbol
+gets quotes and tagged news from the next crawl on. Symbols outside
+COMPANY_NAMES have no company names, so articles are only tagged when
+they mention the ticker itself.
+"""
+import os
+import re
+
+# Built-in symbols and the names they appear under in articles
+COMPANY_NAMES = {
+    'AAPL': ['Apple'],
+    'MSFT': ['Microsoft'],
+    'AMZN': ['Amazon'],
+    'GOOGL': ['Alphabet', 'Google'],
+    'META': ['Meta Platforms', 'Facebook'],
+    'TSLA': ['Tesla'],
+    'NVDA': ['Nvidia', 'NVIDIA'],
+    'JPM': ['JPMorgan', 'JP Morgan'],
+    'V': ['Visa'],
+    'PG': ['Procter & Gamble', 'Procter and Gamble'],
+    'JNJ': ['Johnson & Johnson'],
+    'UNH': ['UnitedHealth'],
+    'HD': ['Home Depot'],
+    'BAC': ['Bank of America'],
+    'MA': ['Mastercard'],
+    '^GSPC': ['S&P 500'],
+    '^DJI': ['Dow Jones'],
+    '^IXIC': ['Nasdaq Composite'],
+    '^FTSE': ['FTSE 100'],
+    '^N225': ['Nikkei'],
+}
+
+# Upper bound on tracked symbols, so a flood of watchlist entries cannot blow up a crawl
+MAX_TRACKED_SYMBOLS = int(os.environ.get('MAX_TRACKED_SYMBOLS', 500))
+
+SYMBOL_RE = re.compile(r'^\^?[A-Z0-9][A-Z0-9.=-]{0,9}$')
+
+
+def load_tracked_companies(engine, limit=MAX_TRACKED_SYMBOLS):
+    """Return {symbol: names} for the built-in symbols plus stored quotes and user watchlists"""
+    companies = dict(COMPANY_NAMES)
+    with engine.connect() as conn:
+        symbols = [symbol for (symbol,) in conn.exec_driver_sql("SELECT symbol FROM latest_quotes")]
+        for (watch_symbols,) in conn.exec_driver_sql(
+            "SELECT watch_symbols FROM user_preferences WHERE watch_symbols IS NOT NULL AND watch_symbols <> ''"
+        ):
+            symbols.extend(symbol.strip().upper() for symbol in watch_symbols.split(','))
+
+    for symbol in symbols:
+        if len(companies) >= limit:
+            break
+        if SYMBOL_RE.match(symbol or ''):
+            companies.setdefault(symbol, [])
+    return companies
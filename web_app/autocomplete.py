@@ -0,0 +1,161 @@
+"""In-memory prefix index for search autocomplete"""
+import re
+import heapq
+import threading
+from bisect import bisect_left
+from collections import Counter
+from models import FinancialNews, LatestQuote
+from tracked_symbols import COMPANY_NAMES
+from related import STOPWORDS
+
+WORD_RE = re.compile(r"[a-z][a-z0-9'&.-]*[a-z0-9]")
+
+# Tickers and company names always rank above headline words
+TRACKED_WEIGHT = 1_000_000
+
+
+class PrefixIndex:
+    """Suggestions kept as one (keys, labels, scores) tuple sorted by key and searched with bisect
+
+    Updates merge new keys into a copy and publish it with a single
+    assignment, so a lookup reads one consistent snapshot without a lock.
+    """
+
+    def __init__(self):
+        self.weights = {}
+        self.entries = ((), (), ())
+
+    def __len__(self):
+        return len(self.entries[0])
+
+    def update(self, entries):
+        """Add (label, weight) entries, adding weights for labels already indexed"""
+        new_keys = set()
+        for label, weight in entries:
+            key = label.lower()
+            current = self.weights.get(key)
+            if current is None:
+                new_keys.add(key)
+            if current is None or (current[1] < TRACKED_WEIGHT <= weight):
+                self.weights[key] = (label, weight)
+            elif weight < TRACKED_WEIGHT:
+                self.weights[key] = (current[0], current[1] + weight)
+
+        # Only the new keys are sorted; bisect finds where each run of old keys ends
+        keys = self.entries[0]
+        merged = []
+        start = 0
+        for key in sorted(new_keys):
+            position = bisect_left(keys, key, start)
+            merged.extend(keys[start:position])
+            merged.append(key)
+            start = position
+        merged.extend(keys[start:])
+
+        keys = tuple(merged)
+        self.entries = (
+            keys,
+            tuple(self.weights[key][0] for key in keys),
+            tuple(self.weights[key][1] for key in keys),
+        )
+
+    def search(self, prefix, limit=8):
+        """Labels whose key starts with prefix, highest weight first"""
+        keys, labels, scores = self.entries
+        prefix = prefix.lower()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + '\uffff', start)
+        best = heapq.nsmallest(limit, range(start, end), key=lambda i: (-scores[i], len(keys[i]), keys[i]))
+        return [labels[i] for i in best]
+
+
+class AutocompleteIndex:
+    """Tickers, company names and headline words of recent articles
+
+    New headlines are added incrementally whenever the pipeline bumps the
+    financial_news data version; the whole index is reloaded once the
+    incremental additions outgrow the headline window.
+    """
+
+    def __init__(self, versions, headline_window=5000, cache_size=5000):
+        self.versions = versions
+        self.headline_window = headline_window
+        self.cache_size = cache_size
+        self.index = None
+        self.version = None
+        self.last_id = 0
+        self.added = 0
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def _headline_terms(self, titles):
+        terms = Counter()
+        for title in titles:
+            terms.update(word for word in set(WORD_RE.findall((title or '').lower()))
+                         if len(word) > 2 and word not in STOPWORDS)
+        return terms
+
+    def _load_headlines(self, after_id=0, limit=None):
+        query = FinancialNews.query.with_entities(FinancialNews.id, FinancialNews.title).filter(
+            FinancialNews.id > after_id
+        ).order_by(FinancialNews.id.desc())
+        if limit:
+            query = query.limit(limit)
+        rows = query.all()
+        if rows:
+            self.last_id = max(self.last_id, rows[0].id)
+        return self._headline_terms(row.title for row in rows), len(rows)
+
+    def _rebuild(self):
+        index = PrefixIndex()
+        symbols = set(COMPANY_NAMES) | {row.symbol for row in LatestQuote.query.with_entities(LatestQuote.symbol)}
+        entries = [(symbol, TRACKED_WEIGHT) for symbol in symbols]
+        entries += [(name, TRACKED_WEIGHT) for names in COMPANY_NAMES.values() for name in names]
+
+        self.last_id = 0
+        terms, self.added = self._load_headlines(limit=self.headline_window)
+        index.update(entries + list(terms.items()))
+        self.index = index
+
+    def refresh(self):
+        """Bring the index up to date with the pipeline; other threads keep using the old one meanwhile"""
+        version = self.versions.current('financial_news')
+        if version == self.version and self.index is not None:
+            return
+        if not self.lock.acquire(blocking=self.index is None):
+            return
+        try:
+            if self.index is None or self.added > 2 * self.headline_window:
+                self._rebuild()
+            else:
+                terms, count = self._load_headlines(after_id=self.last_id)
+                if count:
+                    self.index.update(terms.items())
+                    self.added += count
+            self.version = version
+            self.cache = {}
+        finally:
+            self.lock.release()
+
+    def suggest(self, query, limit=8):
+        """Ranked completions; the last word is completed when the query has several"""
+        self.refresh()
+        query = ' '.join(query.lower().split())
+        cache_key = (query, limit)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        suggestions = self.index.search(query, limit)
+        head, _, last = query.rpartition(' ')
+        if head and len(suggestions) < limit and len(last) > 1:
+            for word in self.index.search(last, limit):
+                completion = f"{head} {word.lower()}"
+                if completion not in suggestions:
+                    suggestions.append(completion)
+            suggestions = suggestions[:limit]
+
+        if len(self.cache) >= self.cache_size:
+            self.cache = {}
+        self.cache[cache_key] = suggestions
+        return suggestions
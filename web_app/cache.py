@@ -0,0 +1,192 @@
+"""Server-side cache for rendered pages and fragments"""
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, session
+from flask_login import current_user
+from markupsafe import Markup
+from extensions import db
+from models import DataVersion
+
+
+class DataVersionTracker:
+    """Reads the data_versions counters at most every check_interval seconds"""
+
+    def __init__(self, check_interval=5):
+        self.check_interval = check_interval
+        self.versions = {}
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if force or self.checked_at is None or now - self.checked_at >= self.check_interval:
+            versions = dict(db.session.query(DataVersion.name, DataVersion.version).all())
+            with self.lock:
+                self.versions = versions
+                self.checked_at = now
+        return self.versions
+
+    def current(self, name):
+        """Return the current version of a table, or 0 if it was never written"""
+        return self.refresh().get(name, 0)
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class RedisCacheBackend:
+    """Cache stored in Redis or any server speaking the Redis protocol"""
+
+    def __init__(self, url, prefix='investor_info:cache:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=max(1, int(ttl)))
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+
+class PageCache:
+    """Caches rendered pages and fragments until their TTL expires or the data changes
+
+    Cache keys include the data_versions counters of the tables a page depends
+    on, so finishing a crawl invalidates every page built from its data.
+    """
+
+    def __init__(self, backend, versions, default_ttl=300, enabled=True):
+        self.backend = backend
+        self.versions = versions
+        self.default_ttl = default_ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def _count(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def make_key(self, name, depends_on):
+        data_version = '.'.join(str(self.versions.current(table)) for table in depends_on)
+        return f"{name}:{data_version}"
+
+    def get_or_render(self, key, render, ttl=None):
+        """Return the cached value for key, rendering and storing it on a miss"""
+        if not self.enabled:
+            return render()
+
+        value = self.backend.get(key)
+        if value is not None:
+            self._count(hit=True)
+            return value
+
+        self._count(hit=False)
+        value = render()
+        self.backend.set(key, value, ttl or self.default_ttl)
+        return value
+
+    def fragment(self, name, render, depends_on=(), ttl=None):
+        """Cache a rendered template fragment; render must return a string"""
+        key = self.make_key(f"fragment:{name}", depends_on)
+        return Markup(self.get_or_render(key, lambda: str(render()), ttl))
+
+    def cached_page(self, depends_on=(), ttl=None):
+        """Decorator caching a view's response body for anonymous GET requests"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # Personalised pages and pages carrying flash messages are never shared
+                if (not self.enabled or request.method != 'GET'
+                        or current_user.is_authenticated or '_flashes' in session):
+                    return view(*args, **kwargs)
+
+                key = self.make_key(f"page:{request.full_path}", depends_on)
+                body = self.backend.get(key)
+                if body is not None:
+                    self._count(hit=True)
+                    return body
+
+                self._count(hit=False)
+                response = view(*args, **kwargs)
+
+                # Only plain rendered pages are cached, never redirects or errors
+                if isinstance(response, str):
+                    self.backend.set(key, response, ttl or self.default_ttl)
+                return response
+            return wrapper
+        return decorator
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0
+            }
+
+
+def create_page_cache(versions):
+    """Create the page cache selected by the CACHE_BACKEND environment variable"""
+    backend_name = os.environ.get('CACHE_BACKEND', 'memory').lower()
+    if backend_name == 'redis':
+        backend = RedisCacheBackend(os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+    else:
+        backend = MemoryCacheBackend(max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', 1000)))
+
+    return PageCache(
+        backend,
+        versions,
+        default_ttl=int(os.environ.get('CACHE_DEFAULT_TTL', 300)),
+        enabled=backend_name != 'none'
+    )
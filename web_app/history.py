@@ -0,0 +1,159 @@
+"""Time-bucketed OHLC price history served from ticks and rollup tables"""
+from datetime import datetime
+import numpy as np
+from extensions import db
+from models import StockTick, StockBarHourly, StockBarDaily
+from timeseries import INTERVALS, aggregate_bars, to_epoch
+
+DATE_UNITS = {
+    'minute': 'm',
+    'hour': 'm',
+    'day': 'D',
+    'week': 'D',
+}
+
+# Table each output interval is built from, and that table's own resolution
+SOURCES = {
+    'minute': (StockTick, None),
+    'hour': (StockBarHourly, 'hour'),
+    'day': (StockBarDaily, 'day'),
+    'week': (StockBarDaily, 'day'),
+}
+
+MAX_POINTS = 500
+
+
+def choose_interval(span_seconds, max_points=MAX_POINTS, requested=None):
+    """Pick the finest interval that keeps the range within max_points buckets
+
+    A requested interval is honoured unless it would produce more than
+    max_points buckets, in which case the next coarser interval is used.
+    """
+    names = list(INTERVALS)
+    start = names.index(requested) if requested in INTERVALS else 0
+    for name in names[start:]:
+        if span_seconds / INTERVALS[name] <= max_points:
+            return name
+    return names[-1]
+
+
+def _empty_series():
+    return {
+        'timestamps': np.array([], dtype=np.int64),
+        'opens': np.array([]), 'highs': np.array([]), 'lows': np.array([]), 'closes': np.array([]),
+        'volumes': np.array([], dtype=np.int64),
+    }
+
+
+def load_ticks(symbol, start_date):
+    """Fetch raw ticks since start_date as arrays, price used for all of OHLC"""
+    rows = db.session.query(StockTick.ts, StockTick.price, StockTick.volume).filter(
+        StockTick.symbol == symbol,
+        StockTick.ts >= start_date,
+        StockTick.price.isnot(None)
+    ).order_by(StockTick.ts).all()
+
+    if not rows:
+        return _empty_series()
+
+    dates, prices, volumes = zip(*rows)
+    prices = np.array(prices, dtype=np.float64)
+    return {
+        'timestamps': to_epoch(dates),
+        'opens': prices, 'highs': prices, 'lows': prices, 'closes': prices,
+        'volumes': np.array([volume or 0 for volume in volumes], dtype=np.int64),
+    }
+
+
+def load_bars(model, symbol, start_date):
+    """Fetch rollup bars since start_date as arrays"""
+    rows = db.session.query(
+        model.bucket_start, model.open, model.high, model.low, model.close, model.volume
+    ).filter(
+        model.symbol == symbol,
+        model.bucket_start >= start_date
+    ).order_by(model.bucket_start).all()
+
+    if not rows:
+        return _empty_series()
+
+    dates, opens, highs, lows, closes, volumes = zip(*rows)
+    return {
+        'timestamps': to_epoch(dates),
+        'opens': np.array(opens, dtype=np.float64),
+        'highs': np.array(highs, dtype=np.float64),
+        'lows': np.array(lows, dtype=np.float64),
+        'closes': np.array(closes, dtype=np.float64),
+        'volumes': np.array([volume or 0 for volume in volumes], dtype=np.int64),
+    }
+
+
+def _concat(head, tail):
+    return {key: np.concatenate([head[key], tail[key]]) for key in head}
+
+
+def load_series(symbol, start_date, interval):
+    """Load the coarsest stored series that still resolves the requested interval
+
+    Rollups run periodically, so the newest stored bar can lag behind the
+    pipeline. It is rebuilt from raw ticks so charts always include the
+    latest quotes.
+    """
+    model, resolution = SOURCES[interval]
+    if resolution is None:
+        return load_ticks(symbol, start_date)
+
+    bars = load_bars(model, symbol, start_date)
+    tail_start = start_date
+    if len(bars['timestamps']):
+        tail_start = max(start_date, bars['timestamps'][-1].astype('datetime64[s]').tolist())
+
+    ticks = load_ticks(symbol, tail_start)
+    if not len(ticks['timestamps']):
+        return bars
+
+    fresh = aggregate_bars(
+        ticks['timestamps'], ticks['opens'], ticks['highs'], ticks['lows'],
+        ticks['closes'], ticks['volumes'], resolution
+    )
+    keep = bars['timestamps'] < fresh['start'][0]
+    stored = {key: values[keep] for key, values in bars.items()}
+    return _concat(stored, {
+        'timestamps': fresh['start'],
+        'opens': fresh['open'], 'highs': fresh['high'], 'lows': fresh['low'],
+        'closes': fresh['close'], 'volumes': fresh['volume'],
+    })
+
+
+def price_history(symbol, span, interval=None, max_points=MAX_POINTS):
+    """Return OHLC points for the last `span` (a timedelta) and the interval used
+
+    Minute bars are only reachable for spans of at most max_points minutes.
+    """
+    end_date = datetime.now()
+    start_date = end_date - span
+    interval = choose_interval(span.total_seconds(), max_points, interval)
+
+    series = load_series(symbol, start_date, interval)
+    bars = aggregate_bars(
+        series['timestamps'], series['opens'], series['highs'], series['lows'],
+        series['closes'], series['volumes'], interval
+    )
+
+    # Keep the most recent buckets if the range is still too long at weekly resolution
+    if len(bars['start']) > max_points:
+        bars = {key: values[-max_points:] for key, values in bars.items()}
+
+    labels = np.datetime_as_string(bars['start'].astype('datetime64[s]'), unit=DATE_UNITS[interval])
+    points = [{
+        'date': label.replace('T', ' '),
+        'open': round(float(open_), 4),
+        'high': round(float(high), 4),
+        'low': round(float(low), 4),
+        'close': round(float(close), 4),
+        'price': round(float(close), 4),
+        'volume': int(volume)
+    } for label, open_, high, low, close, volume in zip(
+        labels, bars['open'], bars['high'], bars['low'], bars['close'], bars['volume']
+    )]
+    return points, interval
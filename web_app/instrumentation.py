@@ -0,0 +1,114 @@
+"""Per-request SQL and latency instrumentation
+
+Every statement run while handling a request is counted and timed through
+SQLAlchemy cursor events. Slow statements are logged with the route that
+issued them. Responses carry a Server-Timing header with the database and
+total time. Request latencies are kept in fixed-bucket histograms per
+route and exported at /metrics in the Prometheus text format.
+
+Under gunicorn, serve.py sets PROMETHEUS_MULTIPROC_DIR. Each worker then
+writes its metrics to files in that directory, and /metrics sums the files
+of all workers, so every worker answers a scrape for the whole server.
+"""
+import os
+import logging
+import time
+from flask import g, request, has_request_context
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency buckets in seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class RouteMetrics:
+    """Latency histograms and query counters per route, kept by prometheus_client"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.registry = CollectorRegistry()
+        self.latency = Histogram('http_request_duration_seconds', 'Request latency by route', ['route'],
+                                 buckets=buckets, registry=self.registry)
+        self.queries = Counter('http_request_queries', 'SQL statements issued by route', ['route'],
+                               registry=self.registry)
+        self.query_seconds = Counter('http_request_query_seconds', 'Time spent in SQL statements by route', ['route'],
+                                     registry=self.registry)
+        self.slow_queries = Counter('db_slow_queries', 'SQL statements slower than the slow query threshold',
+                                    registry=self.registry)
+
+    def observe(self, route, seconds, queries, query_seconds):
+        self.latency.labels(route).observe(seconds)
+        self.queries.labels(route).inc(queries)
+        self.query_seconds.labels(route).inc(query_seconds)
+
+    def record_slow_query(self):
+        self.slow_queries.inc()
+
+    def render(self):
+        """Prometheus text exposition of all routes, summed over every worker in multiprocess mode"""
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = self.registry
+        return generate_latest(registry)
+
+
+def current_route():
+    """Route template of the current request, so /news/1 and /news/2 share one series"""
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+class RequestInstrumentation:
+    """Hooks SQLAlchemy and Flask to time statements and requests"""
+
+    def __init__(self, metrics, slow_query_ms=100, query_warning=25, server_timing=True):
+        self.metrics = metrics
+        self.slow_query = slow_query_ms / 1000
+        self.query_warning = query_warning
+        self.server_timing = server_timing
+
+    def init_app(self, app, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Kept on the statement's execution context, so a statement that raises leaves nothing behind
+        context._query_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_start
+        if not has_request_context():
+            return
+
+        g.sql_queries = g.get('sql_queries', 0) + 1
+        g.sql_time = g.get('sql_time', 0.0) + elapsed
+        if elapsed >= self.slow_query:
+            self.metrics.record_slow_query()
+            logger.warning(f"Slow query ({elapsed * 1000:.1f} ms) in {request.method} {current_route()}: "
+                           f"{' '.join(statement.split())[:500]}")
+
+    def _before_request(self):
+        g.request_start = time.perf_counter()
+        g.sql_queries = 0
+        g.sql_time = 0.0
+
+    def _after_request(self, response):
+        if 'request_start' not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_start
+        route = current_route()
+        self.metrics.observe(route, elapsed, g.sql_queries, g.sql_time)
+
+        if g.sql_queries > self.query_warning:
+            logger.warning(f"{request.method} {route} issued {g.sql_queries} queries")
+        if self.server_timing:
+            response.headers.add(
+                'Server-Timing',
+                f'db;desc="{g.sql_queries} queries";dur={g.sql_time * 1000:.1f}, '
+                f'app;dur={(elapsed - g.sql_time) * 1000:.1f}, total;dur={elapsed * 1000:.1f}'
+            )
+        return response
@@ -37,14 +37,116 @@ class FinancialNews(db.Model):
     source = db.Column(db.String(100))
     publish_date = db.Column(db.String(100))
     sentiment = db.Column(db.Float, default=0)
-    scraped_date = db.Column(db.DateTime, default=datetime.utcnow)
+    scraped_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Short excerpt for listings, loaded only when asked for
+    content_preview = db.column_property(db.func.substr(content, 1, 200), deferred=True)
+    
     bookmarks = db.relationship('Bookmark', backref='news', lazy='dynamic')
     
+    __table_args__ = (
+        db.Index('ft_fin_news', 'title', 'summary', 'content', mysql_prefix='FULLTEXT'),
+    )
+    
     def __repr__(self):
         return f'<FinancialNews {self.title}>'
 
+class NewsFingerprint(db.Model):
+    __tablename__ = 'news_fingerprints'
+    
+    link = db.Column(db.String(512), primary_key=True)
+    minhash = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class NewsDuplicate(db.Model):
+    """Syndicated copy of a stored article, kept as a link to the canonical article"""
+    __tablename__ = 'news_duplicates'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    link = db.Column(db.String(512), unique=True, nullable=False)
+    canonical_link = db.Column(db.String(512), db.ForeignKey('financial_news.link', ondelete='CASCADE'),
+                               nullable=False, index=True)
+    title = db.Column(db.String(255))
+    source = db.Column(db.String(100))
+    similarity = db.Column(db.Float)
+    scraped_date = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @classmethod
+    def for_article(cls, link):
+        """Other sources that published the same story"""
+        return cls.query.filter_by(canonical_link=link).order_by(cls.scraped_date).all()
+    
+    def __repr__(self):
+        return f'<NewsDuplicate {self.link}>'
+
+class RelatedNews(db.Model):
+    """Related article pair scored by the pipeline when the articles were stored"""
+    __tablename__ = 'related_news'
+    
+    news_id = db.Column(db.Integer, db.ForeignKey('financial_news.id', ondelete='CASCADE'), primary_key=True)
+    related_id = db.Column(db.Integer, db.ForeignKey('financial_news.id', ondelete='CASCADE'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+    
+    __table_args__ = (
+        db.Index('idx_related_news_score', 'news_id', 'score'),
+    )
+    
+    @classmethod
+    def articles_for(cls, news_id, limit=3):
+        """Most similar articles to an article, best first"""
+        return FinancialNews.query.join(cls, cls.related_id == FinancialNews.id).filter(
+            cls.news_id == news_id
+        ).options(
+            db.defer(FinancialNews.content)
+        ).order_by(cls.score.desc()).limit(limit).all()
+    
+    def __repr__(self):
+        return f'<RelatedNews {self.news_id} -> {self.related_id}>'
+
+class NewsSymbol(db.Model):
+    """Tracked symbol mentioned by an article, tagged by the pipeline"""
+    __tablename__ = 'news_symbols'
+    
+    news_id = db.Column(db.Integer, db.ForeignKey('financial_news.id', ondelete='CASCADE'), primary_key=True)
+    symbol = db.Column(db.String(10), primary_key=True)
+    mentions = db.Column(db.Integer, nullable=False, default=1)
+    
+    __table_args__ = (
+        db.Index('idx_news_symbols_symbol', 'symbol', 'news_id'),
+    )
+    
+    @classmethod
+    def news_for(cls, symbols, limit=5):
+        """Latest articles mentioning any of the symbols, newest first"""
+        # Derived table rather than IN (...): MySQL does not allow LIMIT inside IN subqueries
+        latest = db.session.query(cls.news_id).filter(
+            cls.symbol.in_(symbols)
+        ).distinct().order_by(cls.news_id.desc()).limit(limit).subquery()
+        return FinancialNews.query.join(latest, latest.c.news_id == FinancialNews.id).options(
+            db.defer(FinancialNews.content),
+            db.undefer(FinancialNews.content_preview)
+        ).order_by(FinancialNews.id.desc()).all()
+    
+    def __repr__(self):
+        return f'<NewsSymbol {self.symbol} in {self.news_id}>'
+
+class NewsCategory(db.Model):
+    """Relevance category of an article, assigned by the nightly relevance analysis"""
+    __tablename__ = 'news_categories'
+    
+    news_id = db.Column(db.Integer, db.ForeignKey('financial_news.id', ondelete='CASCADE'), primary_key=True)
+    category = db.Column(db.String(30), nullable=False)
+    score = db.Column(db.Integer, nullable=False, default=0)
+    analyzed_at = db.Column(db.DateTime, nullable=False)
+    
+    __table_args__ = (
+        db.Index('idx_news_categories_category', 'category', 'news_id'),
+    )
+    
+    def __repr__(self):
+        return f'<NewsCategory {self.news_id}: {self.category}>'
+
 class Bookmark(db.Model):
     __tablename__ = 'bookmarks'
     
@@ -53,6 +155,23 @@ class Bookmark(db.Model):
     news_id = db.Column(db.Integer, db.ForeignKey('financial_news.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    @classmethod
+    def for_user(cls, user_id):
+        """Query a user's bookmarks, newest first, with their articles loaded in the same query"""
+        news_options = db.joinedload(cls.news).defer(FinancialNews.content).undefer(FinancialNews.content_preview)
+        return cls.query.filter_by(user_id=user_id).options(news_options).order_by(cls.created_at.desc())
+    
+    @classmethod
+    def news_ids_for(cls, user_id, news_ids):
+        """Return the subset of news_ids the user has bookmarked"""
+        if not news_ids:
+            return set()
+        rows = db.session.query(cls.news_id).filter(
+            cls.user_id == user_id,
+            cls.news_id.in_(news_ids)
+        )
+        return {row.news_id for row in rows}
+    
     def __repr__(self):
         return f'<Bookmark {self.id}>'
 
@@ -68,10 +187,71 @@ class StockPrice(db.Model):
     market_cap = db.Column(db.BigInteger)
     source = db.Column(db.String(100))
     scraped_date = db.Column(db.DateTime, default=datetime.utcnow)
+    trade_date = db.Column(db.Date)
+    
+    __table_args__ = (
+        db.UniqueConstraint('symbol', 'trade_date', name='symbol_trade_date_unique'),
+    )
     
     def __repr__(self):
         return f'<StockPrice {self.symbol}>'
 
+class StockTick(db.Model):
+    """Append-only intraday quote, one row per symbol and scrape time"""
+    __tablename__ = 'stock_ticks'
+    
+    symbol = db.Column(db.String(10), primary_key=True)
+    ts = db.Column(db.DateTime, primary_key=True)
+    price = db.Column(db.Float)
+    change_amount = db.Column(db.Float)
+    change_percent = db.Column(db.Float)
+    volume = db.Column(db.BigInteger)
+    market_cap = db.Column(db.BigInteger)
+    source = db.Column(db.String(100))
+    
+    def __repr__(self):
+        return f'<StockTick {self.symbol} {self.ts}>'
+
+class StockBarColumns:
+    """Columns shared by the hourly and daily OHLC rollup tables"""
+    symbol = db.Column(db.String(10), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    open = db.Column(db.Float)
+    high = db.Column(db.Float)
+    low = db.Column(db.Float)
+    close = db.Column(db.Float)
+    volume = db.Column(db.BigInteger)
+    tick_count = db.Column(db.Integer)
+
+class StockBarHourly(StockBarColumns, db.Model):
+    __tablename__ = 'stock_bars_hourly'
+    
+    def __repr__(self):
+        return f'<StockBarHourly {self.symbol} {self.bucket_start}>'
+
+class StockBarDaily(StockBarColumns, db.Model):
+    __tablename__ = 'stock_bars_daily'
+    
+    def __repr__(self):
+        return f'<StockBarDaily {self.symbol} {self.bucket_start}>'
+
+class LatestQuote(db.Model):
+    """Most recent quote per symbol, upserted by the pipeline alongside stock_prices"""
+    __tablename__ = 'latest_quotes'
+    
+    symbol = db.Column(db.String(10), primary_key=True)
+    price = db.Column(db.Float)
+    change_amount = db.Column(db.Float)
+    change_percent = db.Column(db.Float)
+    abs_change_percent = db.Column(db.Float, db.Computed('ABS(change_percent)', persisted=True), index=True)
+    volume = db.Column(db.BigInteger)
+    market_cap = db.Column(db.BigInteger)
+    source = db.Column(db.String(100))
+    scraped_date = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<LatestQuote {self.symbol}>'
+
 class UserPreference(db.Model):
     __tablename__ = 'user_preferences'
     
@@ -110,4 +290,15 @@ class UserPreference(db.Model):
             self.preferred_sources = ','.join(sources_list)
     
     def __repr__(self):
-        return f'<UserPreference for User {self.user_id}>'
\ No newline at end of file
+        return f'<UserPreference for User {self.user_id}>'
+
+class DataVersion(db.Model):
+    """Change counter bumped by the scraping pipeline whenever it writes a table"""
+    __tablename__ = 'data_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<DataVersion {self.name}={self.version}>'
\ No newline at end of file
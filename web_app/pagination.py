@@ -0,0 +1,69 @@
+"""Keyset (seek) pagination helpers"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from sqlalchemy import or_, and_
+
+
+def encode_cursor(position):
+    """Encode a page position as an opaque URL-safe token"""
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor token, returning None for missing or malformed tokens"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error):
+        return None
+    return position if isinstance(position, dict) else None
+
+
+def keyset_page(query, date_column, id_column, per_page, position=None):
+    """Return one page of rows ordered newest first, plus the cursor for the next page
+
+    Rows are ordered by (date_column, id_column) descending and the next page
+    seeks past the last row instead of using OFFSET, so deep pages cost the
+    same as the first one.
+    """
+    if position and 'date' in position and 'id' in position:
+        try:
+            last_date = datetime.fromisoformat(position['date'])
+            last_id = int(position['id'])
+        except (TypeError, ValueError):
+            last_date = None
+        if last_date is not None:
+            query = query.filter(or_(
+                date_column < last_date,
+                and_(date_column == last_date, id_column < last_id)
+            ))
+
+    rows = query.order_by(date_column.desc(), id_column.desc()).limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, None
+
+    rows = rows[:per_page]
+    last = rows[-1]
+    return rows, encode_cursor({
+        'date': getattr(last, date_column.key).isoformat(),
+        'id': getattr(last, id_column.key)
+    })
+
+
+def offset_page(query, order_by, per_page, position=None):
+    """Return one page of rows for orderings that cannot be seeked, such as relevance"""
+    offset = 0
+    if position:
+        try:
+            offset = max(0, int(position.get('offset', 0)))
+        except (TypeError, ValueError):
+            offset = 0
+
+    rows = query.order_by(*order_by).offset(offset).limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, None
+    return rows[:per_page], encode_cursor({'offset': offset + per_page})
@@ -0,0 +1,86 @@
+"""Latest stock quote lookups and the in-process latest-quote cache"""
+import hashlib
+import threading
+from models import LatestQuote
+
+
+def quote_to_dict(stock):
+    """Serialize a LatestQuote or StockPrice row for the JSON APIs"""
+    return {
+        'symbol': stock.symbol,
+        'price': stock.price,
+        'change_amount': stock.change_amount,
+        'change_percent': stock.change_percent,
+        'volume': stock.volume,
+        'market_cap': stock.market_cap,
+        'scraped_date': stock.scraped_date.isoformat() if stock.scraped_date else None
+    }
+
+
+def query_latest_quotes(symbols):
+    """Return the LatestQuote row for each symbol in a single primary-key lookup"""
+    if not symbols:
+        return []
+    return LatestQuote.query.filter(LatestQuote.symbol.in_(symbols)).all()
+
+
+def latest_quotes(symbols):
+    """Return the latest quote for each symbol that has data, in the given order"""
+    by_symbol = {stock.symbol: stock for stock in query_latest_quotes(symbols)}
+    return [by_symbol[symbol] for symbol in symbols if symbol in by_symbol]
+
+
+def trending_quotes(limit=5):
+    """Return the symbols with the largest absolute percentage move"""
+    return LatestQuote.query.order_by(LatestQuote.abs_change_percent.desc()).limit(limit).all()
+
+
+class LatestQuoteCache:
+    """Caches the latest quote per symbol until the stock pipeline writes again
+
+    The pipeline bumps the 'stock_prices' row in data_versions on every flush.
+    The version tracker re-reads those counters periodically, and the cache
+    drops all cached quotes when the stock version changes.
+    """
+
+    def __init__(self, versions):
+        self.versions = versions
+        self.quotes = {}
+        self.version = None
+        self.lock = threading.Lock()
+
+    def current_version(self):
+        """Return the stock data version, dropping cached quotes when it has changed"""
+        version = self.versions.current('stock_prices')
+        with self.lock:
+            if version != self.version:
+                self.quotes = {}
+                self.version = version
+        return version
+
+    def invalidate(self):
+        """Drop all cached quotes"""
+        with self.lock:
+            self.quotes = {}
+
+    def get_many(self, symbols):
+        """Return cached quote dicts for the symbols that have data, in request order"""
+        self.current_version()
+
+        with self.lock:
+            quotes = self.quotes
+            missing = [symbol for symbol in symbols if symbol not in quotes]
+
+        if missing:
+            found = {stock.symbol: quote_to_dict(stock) for stock in query_latest_quotes(missing)}
+            with self.lock:
+                # Remember misses too so unknown symbols don't hit the database on every poll
+                for symbol in missing:
+                    quotes[symbol] = found.get(symbol)
+
+        return [quotes[symbol] for symbol in symbols if quotes.get(symbol)]
+
+    def etag(self, symbols):
+        """ETag for a symbol set; changes only when new stock data is written"""
+        key = f"{self.current_version()}:{','.join(sorted(symbols))}"
+        return hashlib.sha1(key.encode()).hexdigest()
@@ -0,0 +1,236 @@
+"""Full-text search backends for financial news"""
+import os
+import re
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import or_, desc, case, false
+from sqlalchemy.dialects.mysql import match
+from extensions import db
+from models import FinancialNews
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class LikeSearchBackend:
+    """Substring matching with LIKE - works everywhere but scans the whole table"""
+    name = 'like'
+
+    def apply(self, query, terms):
+        """Filter a FinancialNews query by the search terms
+
+        Returns the filtered query and an order_by expression for relevance
+        ranking, or None when the backend cannot rank results.
+        """
+        query = query.filter(
+            or_(
+                FinancialNews.title.contains(terms),
+                FinancialNews.summary.contains(terms),
+                FinancialNews.content.contains(terms)
+            )
+        )
+        return query, None
+
+
+class MySQLFulltextBackend:
+    """MATCH ... AGAINST on the ft_fin_news FULLTEXT index"""
+    name = 'mysql'
+
+    def apply(self, query, terms):
+        relevance = match(
+            FinancialNews.title,
+            FinancialNews.summary,
+            FinancialNews.content,
+            against=terms
+        ).in_natural_language_mode()
+        return query.filter(relevance > 0), desc(relevance)
+
+
+class SQLiteFTSBackend:
+    """Local FTS5 inverted index kept in sync with the financial_news table
+
+    New articles are indexed by a background thread every sync_interval
+    seconds, so searches never wait for indexing after a crawl. Only one
+    process per index file syncs: the first to take its lock file keeps it,
+    and the other gunicorn workers just read the index. Articles deleted
+    from financial_news are pruned every prune_interval seconds.
+    """
+    name = 'sqlite'
+
+    def __init__(self, path, max_results=0, sync_interval=60, prune_interval=3600):
+        self.path = path
+        self.max_results = max_results
+        self.sync_interval = sync_interval
+        self.prune_interval = prune_interval
+        self.last_prune = None
+        self.lock = threading.Lock()
+        self.thread = None
+        self.lock_file = None
+        self._create_index()
+
+    def start(self, app):
+        """Start the sync thread; the first sync runs right away in the process that wins the lock"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, args=(app,), name='search-index-sync', daemon=True)
+            self.thread.start()
+
+    def _acquire_sync_lock(self):
+        """Take the index's lock file without blocking; held until the process exits"""
+        if self.lock_file is not None:
+            return True
+        if fcntl is None:
+            # No advisory locks (Windows): only the single waitress process syncs there
+            self.lock_file = True
+            return True
+        lock_file = open(f"{self.path}.lock", 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self.lock_file = lock_file
+        return True
+
+    def _run(self, app):
+        while True:
+            try:
+                # Workers that lose keep retrying, so syncing resumes if the syncing worker exits
+                if self._acquire_sync_lock():
+                    with app.app_context():
+                        indexed = self.sync(db.session)
+                        if self.last_prune is None or time.monotonic() - self.last_prune >= self.prune_interval:
+                            pruned = self.prune(db.session)
+                            self.last_prune = time.monotonic()
+                            if pruned:
+                                app.logger.info(f"Removed {pruned} deleted articles from the search index")
+                    if indexed:
+                        app.logger.info(f"Indexed {indexed} articles for search")
+            except Exception as e:
+                app.logger.error(f"Search index sync failed: {e}")
+            time.sleep(self.sync_interval)
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def _create_index(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS news_fts
+                USING fts5(title, summary, content, tokenize='porter unicode61')
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS news_fts_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _get_meta(self, conn, key):
+        row = conn.execute("SELECT value FROM news_fts_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def sync(self, session, batch_size=500):
+        """Index articles scraped since the last sync and return how many were indexed"""
+        with self.lock:
+            with self._connect() as conn:
+                last_scraped = self._get_meta(conn, 'last_scraped_date')
+                rows = session.query(
+                    FinancialNews.id,
+                    FinancialNews.title,
+                    FinancialNews.summary,
+                    FinancialNews.content,
+                    FinancialNews.scraped_date
+                ).order_by(FinancialNews.scraped_date)
+
+                # Upserts refresh scraped_date, so updated articles are picked up again
+                if last_scraped:
+                    rows = rows.filter(FinancialNews.scraped_date >= datetime.fromisoformat(last_scraped))
+
+                indexed = 0
+                newest = last_scraped
+                for row in rows.yield_per(batch_size):
+                    conn.execute("DELETE FROM news_fts WHERE rowid = ?", (row.id,))
+                    conn.execute(
+                        "INSERT INTO news_fts (rowid, title, summary, content) VALUES (?, ?, ?, ?)",
+                        (row.id, row.title or '', row.summary or '', row.content or '')
+                    )
+                    if row.scraped_date:
+                        newest = row.scraped_date.isoformat()
+                    indexed += 1
+
+                if newest:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO news_fts_meta (key, value) VALUES ('last_scraped_date', ?)",
+                        (newest,)
+                    )
+        return indexed
+
+    def prune(self, session):
+        """Remove articles that no longer exist in financial_news and return how many were removed"""
+        with self.lock:
+            stored = {news_id for (news_id,) in session.query(FinancialNews.id)}
+            with self._connect() as conn:
+                deleted = [rowid for (rowid,) in conn.execute("SELECT rowid FROM news_fts") if rowid not in stored]
+                conn.executemany("DELETE FROM news_fts WHERE rowid = ?", [(rowid,) for rowid in deleted])
+        return len(deleted)
+
+    def rebuild(self, session):
+        """Drop the index and re-index every article"""
+        with self.lock:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM news_fts")
+                conn.execute("DELETE FROM news_fts_meta")
+        return self.sync(session)
+
+    def ranked_ids(self, terms):
+        """Return matching article ids, best match first
+
+        Every match is returned unless max_results caps it, so date-sorted
+        and later pages see all of them; a capped result is logged.
+        """
+        tokens = TOKEN_RE.findall(terms)
+        if not tokens:
+            return []
+
+        # Quote every token so user input cannot inject FTS5 query syntax
+        fts_query = ' OR '.join(f'"{token}"' for token in tokens)
+        limit = self.max_results + 1 if self.max_results else -1
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT rowid FROM news_fts WHERE news_fts MATCH ? ORDER BY bm25(news_fts) LIMIT ?",
+                (fts_query, limit)
+            ).fetchall()
+        if self.max_results and len(rows) > self.max_results:
+            logger.warning(f"Search for {terms!r} matched more than SEARCH_MAX_RESULTS={self.max_results} articles; "
+                           f"only the best {self.max_results} are shown")
+            rows = rows[:self.max_results]
+        return [row[0] for row in rows]
+
+    def apply(self, query, terms):
+        ids = self.ranked_ids(terms)
+        if not ids:
+            return query.filter(false()), None
+
+        rank = case({news_id: position for position, news_id in enumerate(ids)}, value=FinancialNews.id)
+        return query.filter(FinancialNews.id.in_(ids)), rank
+
+
+def create_search_backend(database_uri):
+    """Create the search backend selected by the SEARCH_BACKEND environment variable"""
+    default = 'mysql' if database_uri.startswith('mysql') else 'like'
+    backend = os.environ.get('SEARCH_BACKEND', default).lower()
+
+    if backend == 'mysql':
+        return MySQLFulltextBackend()
+    if backend == 'sqlite':
+        path = os.environ.get('SEARCH_INDEX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'search_index.db'))
+        return SQLiteFTSBackend(
+            path,
+            max_results=int(os.environ.get('SEARCH_MAX_RESULTS', 0)),
+            sync_interval=int(os.environ.get('SEARCH_SYNC_INTERVAL', 60))
+        )
+    return LikeSearchBackend()
@@ -0,0 +1,111 @@
+"""Serve the web app with a production WSGI server
+
+Run from the web_app directory with:  python serve.py
+
+WEB_SERVER selects the server:
+- gunicorn: pre-forked worker processes with threads (Linux/macOS)
+- waitress: a single multi-threaded process (any platform)
+- dev: Flask's debug server with the reloader, for local development only
+"""
+import os
+import signal
+import sys
+import tempfile
+
+WEB_SERVER = os.environ.get('WEB_SERVER', 'gunicorn').lower()
+WEB_HOST = os.environ.get('WEB_HOST', '0.0.0.0')
+WEB_PORT = int(os.environ.get('WEB_PORT', 5000))
+WEB_WORKERS = int(os.environ.get('WEB_WORKERS', (os.cpu_count() or 1) * 2 + 1))
+WEB_THREADS = int(os.environ.get('WEB_THREADS', 4))
+# Open quote streams each hold a thread while they wait for updates, so they
+# get threads of their own and never take the ones serving requests
+QUOTE_STREAM_MAX_CLIENTS = int(os.environ.get('QUOTE_STREAM_MAX_CLIENTS', 16))
+WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 30))
+WEB_GRACEFUL_TIMEOUT = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+
+
+def prepare_metrics_dir():
+    """Point every worker's metrics at one directory, emptied of a previous run's files"""
+    metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR') or tempfile.mkdtemp(prefix='web-metrics-')
+    os.makedirs(metrics_dir, exist_ok=True)
+    for name in os.listdir(metrics_dir):
+        if name.endswith('.db'):
+            os.remove(os.path.join(metrics_dir, name))
+    # Inherited by the forked workers before they import app.py and prometheus_client
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = metrics_dir
+
+
+def serve_gunicorn():
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise RuntimeError("WEB_SERVER=gunicorn requires the 'gunicorn' package")
+
+    prepare_metrics_dir()
+
+    class WebApplication(BaseApplication):
+        """Embedded gunicorn arbiter serving app.py's Flask app"""
+
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Imported in each worker after the fork so no pooled connection is shared
+            from app import app
+            return app
+
+    WebApplication({
+        'bind': f"{WEB_HOST}:{WEB_PORT}",
+        'workers': WEB_WORKERS,
+        'threads': WEB_THREADS + QUOTE_STREAM_MAX_CLIENTS,
+        'worker_class': 'gthread',
+        'timeout': WEB_TIMEOUT,
+        # On SIGTERM workers finish in-flight requests for up to this many seconds
+        'graceful_timeout': WEB_GRACEFUL_TIMEOUT,
+        'preload_app': False,
+        'accesslog': '-',
+    }).run()
+
+
+def serve_waitress():
+    try:
+        from waitress import create_server
+    except ImportError:
+        raise RuntimeError("WEB_SERVER=waitress requires the 'waitress' package")
+
+    from app import app
+    server = create_server(app, host=WEB_HOST, port=WEB_PORT, threads=WEB_THREADS + QUOTE_STREAM_MAX_CLIENTS)
+
+    # Stop accepting connections on SIGTERM as well as Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.close())
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+def serve_dev():
+    from app import app, db
+    with app.app_context():
+        # Create all tables if they don't exist
+        db.create_all()
+    app.run(host=WEB_HOST, port=WEB_PORT, debug=True)
+
+
+SERVERS = {
+    'gunicorn': serve_gunicorn,
+    'waitress': serve_waitress,
+    'dev': serve_dev,
+}
+
+if __name__ == '__main__':
+    if WEB_SERVER not in SERVERS:
+        sys.exit(f"Unknown WEB_SERVER '{WEB_SERVER}', expected one of: {', '.join(SERVERS)}")
+    SERVERS[WEB_SERVER]()
@@ -164,20 +164,38 @@ function setupAjaxBookmarks() {
 }
 
 /**
- * Sets up the stock watchlist with real-time updates
+ * Sets up the stock watchlist with real-time updates.
+ * Quote changes are pushed over Server-Sent Events; browsers without
+ * EventSource, or turned away by a busy server, poll every 5 minutes instead.
  */
 function setupWatchlist() {
     const watchlistContainer = document.getElementById('watchlist');
     if (!watchlistContainer) return;
     
-    // Refresh watchlist data every 5 minutes
-    updateWatchlistData();
-    setInterval(updateWatchlistData, 300000);
+    const symbols = watchlistContainer.getAttribute('data-symbols');
+    if (!symbols) return;
+    
+    if (window.EventSource) {
+        const source = new EventSource('/api/stocks/stream?symbols=' + encodeURIComponent(symbols));
+        source.addEventListener('quotes', function(event) {
+            JSON.parse(event.data).forEach(updateStockCard);
+        });
+        source.onerror = function() {
+            // The browser reconnects by itself unless the server refused the stream
+            if (source.readyState === EventSource.CLOSED) {
+                startPolling();
+            }
+        };
+    } else {
+        startPolling();
+    }
+    
+    function startPolling() {
+        updateWatchlistData();
+        setInterval(updateWatchlistData, 300000);
+    }
     
     function updateWatchlistData() {
-        const symbols = watchlistContainer.getAttribute('data-symbols');
-        if (!symbols) return;
-        
         // Add loading indicator
         watchlistContainer.classList.add('loading');
         
@@ -188,31 +206,40 @@ function setupWatchlist() {
                 watchlistContainer.classList.remove('loading');
                 
                 // Update each stock card with new data
-                data.forEach(stock => {
-                    const stockCard = document.querySelector(`.stock-card[data-symbol="${stock.symbol}"]`);
-                    if (stockCard) {
-                        const priceEl = stockCard.querySelector('.stock-price');
-                        const changeEl = stockCard.querySelector('.stock-change');
-                        
-                        if (priceEl) priceEl.textContent = ' + stock.price';
-                        
-                        if (changeEl) {
-                            changeEl.textContent = stock.change_amount + ' (' + stock.change_percent + '%)';
-                            changeEl.className = 'stock-change';
-                            if (stock.change_amount > 0) {
-                                changeEl.classList.add('text-success');
-                            } else if (stock.change_amount < 0) {
-                                changeEl.classList.add('text-danger');
-                            }
-                        }
-                    }
-                });
+                data.forEach(updateStockCard);
             })
             .catch(error => {
                 console.error('Error updating watchlist:', error);
                 watchlistContainer.classList.remove('loading');
             });
     }
+    
+    function updateStockCard(stock) {
+        const card = document.querySelector(`.stock-card[data-symbol="${stock.symbol}"]`);
+        if (!card) return;
+        
+        const priceEl = card.querySelector('.stock-price');
+        const changeEl = card.querySelector('.stock-change');
+        
+        if (priceEl) priceEl.textContent = '$' + stock.price;
+        
+        if (changeEl) {
+            changeEl.textContent = '';
+            
+            const icon = document.createElement('i');
+            changeEl.classList.remove('text-success', 'text-danger');
+            if (stock.change_amount > 0) {
+                changeEl.classList.add('text-success');
+                icon.classList.add('fas', 'fa-arrow-up');
+            } else if (stock.change_amount < 0) {
+                changeEl.classList.add('text-danger');
+                icon.classList.add('fas', 'fa-arrow-down');
+            }
+            changeEl.appendChild(icon);
+            
+            changeEl.append(' ' + stock.change_amount + ' (' + stock.change_percent + '%)');
+        }
+    }
 }
 
 /**
@@ -0,0 +1,136 @@
+"""Live quote updates pushed to browsers with Server-Sent Events"""
+import json
+import queue
+import threading
+import time
+
+
+class QuoteSubscription:
+    """One connected client: its symbols and a queue of quote batches to send"""
+
+    def __init__(self, symbols, max_pending=10):
+        self.symbols = frozenset(symbols)
+        self.queue = queue.Queue(maxsize=max_pending)
+
+    def push(self, quotes):
+        try:
+            self.queue.put_nowait(quotes)
+        except queue.Full:
+            # Drop updates for a stalled client; its next reconnect starts from a fresh snapshot
+            pass
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class QuoteBroadcaster:
+    """Fans quote changes out to every subscribed client from one background thread
+
+    The thread watches the 'stock_prices' data version the pipeline bumps
+    on every flush. When it changes, the latest quotes of all subscribed
+    symbols are read once through the quote cache, and each client is sent
+    only the quotes in its own symbol set that differ from what it was last
+    sent. Database work therefore grows with the number of crawls, not the
+    number of clients.
+    """
+
+    def __init__(self, app, quote_cache, poll_interval=2, max_subscribers=10):
+        self.app = app
+        self.quote_cache = quote_cache
+        self.poll_interval = poll_interval
+        self.max_subscribers = max_subscribers
+        self.subscriptions = set()
+        self.latest = {}
+        self.version = None
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def subscribe(self, symbols):
+        """Register a client and return (subscription, snapshot), or (None, None) when full"""
+        with self.lock:
+            if len(self.subscriptions) >= self.max_subscribers:
+                return None, None
+            subscription = QuoteSubscription(symbols)
+            self.subscriptions.add(subscription)
+            if self.thread is None or not self.thread.is_alive():
+                self.version = None
+                self.thread = threading.Thread(target=self._run, name='quote-broadcaster', daemon=True)
+                self.thread.start()
+
+        # Registered before the snapshot so no broadcast falls between the two;
+        # served from the shared quote cache, so a new client rarely costs a query
+        try:
+            return subscription, self.quote_cache.get_many(list(symbols))
+        except BaseException:
+            self.unsubscribe(subscription)
+            raise
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def subscriber_count(self):
+        with self.lock:
+            return len(self.subscriptions)
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self.lock:
+                if not self.subscriptions:
+                    self.thread = None
+                    return
+            try:
+                with self.app.app_context():
+                    self.broadcast()
+            except Exception as e:
+                self.app.logger.error(f"Quote broadcast failed: {e}")
+
+    def broadcast(self):
+        """Send changed quotes to subscribers if the stock data version moved"""
+        version = self.quote_cache.current_version()
+        if version == self.version:
+            return
+        first_run, self.version = self.version is None, version
+
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        symbols = sorted(set().union(*(subscription.symbols for subscription in subscriptions)))
+        quotes = {quote['symbol']: quote for quote in self.quote_cache.get_many(symbols)}
+
+        changed = {symbol: quote for symbol, quote in quotes.items() if self.latest.get(symbol) != quote}
+        self.latest = quotes
+        if first_run or not changed:
+            # New clients already got a snapshot; the first pass only sets the baseline
+            return
+
+        for subscription in subscriptions:
+            delta = [changed[symbol] for symbol in subscription.symbols if symbol in changed]
+            if delta:
+                subscription.push(delta)
+
+
+def sse_event(data, event=None):
+    """Format one Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ''
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+def quote_events(broadcaster, subscription, snapshot, keepalive=15, max_duration=300):
+    """Event stream for one client: a snapshot, then deltas and keep-alive comments
+
+    Streams end after max_duration seconds; the browser reconnects on its own,
+    which frees the server thread now and then.
+    """
+    try:
+        yield "retry: 3000\n\n"
+        yield sse_event(snapshot, 'quotes')
+        deadline = time.monotonic() + max_duration
+        while time.monotonic() < deadline:
+            quotes = subscription.get(timeout=keepalive)
+            yield sse_event(quotes, 'quotes') if quotes else ": keepalive\n\n"
+    finally:
+        broadcaster.unsubscribe(subscription)